@@ -1,4 +1,4 @@
-from .defines import Cmd
+from .defines import Cmd, Feature, Format
 from .Settings import Settings
 from .ui.Ui_Config import Ui_Config
 
@@ -6,6 +6,16 @@ from PyQt5.QtCore import QSize, QRegExp
 from PyQt5.QtGui import QRegExpValidator, QCloseEvent
 from PyQt5.QtWidgets import QDialog, QLineEdit
 
+# format of every signal offered by the dialog, INT16 needs no Feature.FORMAT
+SAMPLE_FORMATS = [
+    ("int16", Format.INT16),
+    ("int8", Format.INT8),
+    ("int32", Format.INT32),
+    ("float32", Format.FLOAT32),
+    ("int8 delta", Format.INT8 | Format.DELTA),
+    ("int16 delta", Format.INT16 | Format.DELTA),
+    ("int32 delta", Format.INT32 | Format.DELTA),
+]
 
 class Config(QDialog, Ui_Config):
     def __init__(self, parent=None):
@@ -17,6 +27,8 @@ class Config(QDialog, Ui_Config):
         self.minVoltageLabel.setToolTip(Settings.byObject(self).minVoltageTip)
         self.maxVoltageLabel.setToolTip(Settings.byObject(self).maxVoltageTip)
         self.updateTimeLabel.setToolTip(Settings.byObject(self).updateTimeTip)
+        self.blockLengthLabel.setToolTip(Settings.byObject(self).blockLengthTip)
+        self.sampleFormatLabel.setToolTip(Settings.byObject(self).sampleFormatTip)
         self.generateButton.clicked.connect(self.generate)
         self.signalsNumberSpinBox.valueChanged.connect(self.manageNamesLines)
         self.signalNameLineEdit.setValidator(
@@ -49,6 +61,14 @@ class Config(QDialog, Ui_Config):
             "value", Settings.byObject(self).lastUpdateTime
         )
 
+        self.blockLengthSpinBox.setProperty(
+            "value", Settings.byObject(self).lastBlockLength
+        )
+
+        for name, sampleFormat in SAMPLE_FORMATS:
+            self.sampleFormatComboBox.addItem(name, sampleFormat)
+        self.sampleFormatComboBox.setCurrentIndex(Settings.byObject(self).lastSampleFormat)
+
         self.signals = [self.signalNameLineEdit]  # by default we start with 1 signal
 
         self.doneDict = {
@@ -146,8 +166,16 @@ class Config(QDialog, Ui_Config):
         )
 
     def generate(self):
+        blockLength = self.blockLengthSpinBox.value()
+        sampleFormat = self.sampleFormatComboBox.currentData()
+        if sampleFormat & Format.DELTA and not blockLength:
+            self.resultTextBrowser.setText("Delta formats need a block length.")
+            return
+        # announced features go into the low bytes of CFG_START
+        start = Cmd.CFG_START | (Feature.BLOCK if blockLength else 0) \
+            | (Feature.FORMAT if sampleFormat else 0)
         # first translate numerical values
-        array = [hex((Cmd.CFG_START >> 8 * i) & 0xFF) for i in range(Cmd.SIZE)]
+        array = [hex((start >> 8 * i) & 0xFF) for i in range(Cmd.SIZE)]
         array += [
             self.to_hex(i)
             for i in [                
@@ -163,6 +191,12 @@ class Config(QDialog, Ui_Config):
         for signal in self.signals:
             array.append(hex(len(signal.text())))
             array.extend([hex(ord(char)) for char in signal.text()])
+        # block mode ends with max samples per DATA_START
+        if blockLength:
+            array += [hex(blockLength & 0xFF), hex((blockLength >> 8) & 0xFF)]
+        # and the format of every signal
+        if sampleFormat:
+            array += [hex(sampleFormat)] * len(self.signals)
 
         array = ["\n\t" + i if order % 4 == 0 else i for order, i in enumerate(array)]
         array_final = "{" + ", ".join(value for value in array) + "\n}"
@@ -186,6 +220,8 @@ class Config(QDialog, Ui_Config):
         Settings.byObject(self).lastMinVoltage = self.minVoltageSpinBox.value()
         Settings.byObject(self).lastMaxVoltage = self.maxVoltageSpinBox.value()
         Settings.byObject(self).lastUpdateTime = self.updateTimeSpinBox.value()
+        Settings.byObject(self).lastBlockLength = self.blockLengthSpinBox.value()
+        Settings.byObject(self).lastSampleFormat = self.sampleFormatComboBox.currentIndex()
         event.accept()
 
     @staticmethod
@@ -0,0 +1,47 @@
+from .protocol import handshake
+
+import time
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class Connector(QThread):
+	"""
+	Performs PC_HELLO/CFG_START handshake on the opened port outside of
+	the GUI thread, so a slow or silent device doesn't freeze the window
+	"""
+	progress = pyqtSignal(int, int)
+	connected = pyqtSignal(object)
+	failed = pyqtSignal(str)
+
+	def __init__(self, port, timeout, attempts, parent=None):
+		super().__init__(parent)
+		self.port = port
+		self.timeout = timeout
+		self.attempts = attempts
+		# time from the first PC_HELLO to the parsed config
+		self.elapsed = None
+
+	def run(self):
+		started = time.monotonic()
+		try:
+			cfgData = handshake(
+				self.port, self.timeout, self.attempts,
+				progress=lambda attempt: self.progress.emit(attempt, self.attempts),
+				cancelled=self.isInterruptionRequested,
+			)
+		except InterruptedError:
+			return
+		except OSError as e:
+			self.failed.emit("Unexpected exception occured!\n" + str(e))
+			return
+		except (ValueError, RuntimeError, UnicodeDecodeError) as e:
+			self.failed.emit(str(e))
+			return
+		self.elapsed = time.monotonic() - started
+		if not self.isInterruptionRequested():
+			self.connected.emit(cfgData)
+
+	def cancel(self):
+		self.requestInterruption()
+		self.wait()
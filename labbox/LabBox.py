@@ -1,23 +1,34 @@
 from .defines import *
-from .Config import Config
+from .Reader import Reader
+from .Connector import Connector
 from .ui.Ui_LabBox import Ui_LabBox
 from .Settings import Settings
+from .ringbuffer import RingBuffer
+from .recording import open_log, EXTENSION as RECORDING_EXTENSION
+from .replay import ReplayPort
+from .transport import open_transport, is_socket
+from .capture import CapturePort
+from .metrics import Metrics, format_report
 
 import os
-import serial
+import time
 import numpy as np
-from collections import deque
-from itertools import islice
 
-from PyQt5.QtWidgets import QFileDialog, QMessageBox, QMainWindow
+from PyQt5.QtWidgets import QFileDialog, QMessageBox, QMainWindow, QShortcut, QProgressBar
 from PyQt5.QtCore import QRegExp, QTimer, Qt
-from PyQt5.QtGui import QRegExpValidator, QColor, QIcon, QPixmap
+from PyQt5.QtGui import QRegExpValidator, QColor, QIcon, QPixmap, QKeySequence
 
 
 
 class LabBox(QMainWindow, Ui_LabBox):
-	def __init__(self, parent=None):
+	def __init__(self, parent=None, capturePath=None, metricsPath=None, replaySpeed=None):
 		super().__init__(parent)
+		# raw received bytes are dumped there when set
+		self.capturePath = capturePath
+		# acquisition metrics are appended there as JSON lines when set
+		self.metricsPath = metricsPath
+		# overrides replaySpeed of settings when set
+		self.replaySpeed = replaySpeed
 		self.lineColors = Settings.byObject(self).lineColors
 		self.pointsNumber = Settings.byObject(self).defaultPointsNumber
 		self.reinit()
@@ -26,21 +37,32 @@ class LabBox(QMainWindow, Ui_LabBox):
 	def reinit(self):
 		self.microConnected = False
 		self.port = None
+		self.connector = None
+		self.connectTime = None
+		self.reader = None
 		self.plotTimer = QTimer()
 		self.sliderTimer = QTimer()		
 		self.lastSliderValue = 0
 		self.cfgData = CfgData()
-		self.pointsStack = np.arange(0, self.pointsNumber, 1)
-		self.plotStack = []
+		self.plotStack = None
+		self.timeStack = None
+		self.gapStack = None
 		self.csvPath = None
-		self.csvFile = None
-		self.timerValue = 0
+		self.logWriter = None
+		self.renderPending = False
+		self.metrics = None
 
 	###GUI setups###
 	def setup(self):
 		self.setupUi(self)
 		self.setFixedSize(self.size())
 		self.statusBar().setSizeGripEnabled(False)
+		# busy indicator shown while handshake is in progress
+		self.connectProgress = QProgressBar()
+		self.connectProgress.setRange(0, 0)
+		self.connectProgress.setMaximumWidth(100)
+		self.connectProgress.hide()
+		self.statusBar().addPermanentWidget(self.connectProgress)
 		self.usbRadioButton.setEnabled(False)
 		self.usbRadioButton.toggled.connect(lambda: self.hideBaudrateField(True))
 		self.serialRadioButton.toggled.connect(lambda: self.hideBaudrateField(False))
@@ -108,6 +130,14 @@ class LabBox(QMainWindow, Ui_LabBox):
 		)
 		self.PointsNumberLineEdit.returnPressed.connect(self.onChangePointsNumber)
 
+		seekStep = Settings.byObject(self).replaySeekStep
+		QShortcut(QKeySequence(Qt.Key_PageDown), self).activated.connect(
+			lambda: self.seekReplay(seekStep)
+		)
+		QShortcut(QKeySequence(Qt.Key_PageUp), self).activated.connect(
+			lambda: self.seekReplay(-seekStep)
+		)
+
 		# init plot
 		self.plotView.setBackground(QColor(0xEF, 0xEF, 0xEF))
 		self.plotView.plot.setContentsMargins(10, 0, 10, 0)
@@ -133,8 +163,15 @@ class LabBox(QMainWindow, Ui_LabBox):
 			)
 
 	def initPlayground(self):
-		self.sendSliderValue()
-		self.sendLineEditValue()
+		# initial values go out together in a single write
+		commands = []
+		sliderValue = self.slider.value()
+		if self.lastSliderValue != sliderValue:
+			commands.append(self.packCommand(Cmd.PLAYGROUND, Playground.SLIDER, int(sliderValue)))
+		commands.append(self.packCommand(
+			Cmd.PLAYGROUND, Playground.LINE_EDIT, int(self.valueLineEdit.text())
+		))
+		self.writelines(commands)
 		self.lastSliderValue = 0
 		self.sliderTimer.timeout.connect(self.sendSliderValue)
 		self.sliderTimer.start(self.cfgData.updateTime)
@@ -163,11 +200,14 @@ class LabBox(QMainWindow, Ui_LabBox):
 	def onOpenCSVPathDialog(self):
 		csvPathLineDialog = QFileDialog()
 		pathSave, _ = csvPathLineDialog.getSaveFileName(
-			self, "Save File", "/home/", "CSV (*.csv);;All files (*.*)"
+			self, "Save File", "/home/",
+			"CSV (*.csv);;LabBox recording (*" + RECORDING_EXTENSION + ");;All files (*.*)"
 		)
 		self.csvPathLineEdit.setText(pathSave)
 
 	def onOpenCfgDialog(self):
+		# dialog is rarely used, so it's loaded on demand to shorten startup
+		from .Config import Config
 		cfgDialog = Config(self)
 		# cfgDialog.layout().setSizeConstraint(QLayout.SetFixedSize)
 		cfgDialog.open()
@@ -181,6 +221,9 @@ class LabBox(QMainWindow, Ui_LabBox):
 			QMessageBox.No,
 		)
 
+		if self.connector:
+			self.connector.cancel()
+			self.abortConnect()
 		if reply == QMessageBox.Yes:
 			Settings.byObject(self).lastDevicePath = \
 				self.devicePathLineEdit.text()
@@ -194,38 +237,25 @@ class LabBox(QMainWindow, Ui_LabBox):
 	def enableLeftPanel(self, state):
 		self.signalFunctionBox.setEnabled(state)  # now we put it in single groupbox
 
+	def enableConnectionPanel(self, state):
+		self.connectionGroupBox.setEnabled(state)
+		self.devicePathLineEdit.setEnabled(state)
+		self.baudrateComboBox.setEnabled(state)
+		self.csvPathLineEdit.setEnabled(state)
+
 	def onConnectButtonClick(self):
-		if not self.microConnected:
+		if self.connector:
+			# clicking again while handshake is in progress cancels it
+			self.connector.cancel()
+			self.abortConnect()
+		elif not self.microConnected:
 			try:
 				self.reinit()
-
-				# forbidding user to click it while connecting
-				self.connectButton.setEnabled(False)
 				self.connectMicro()
-				self.connectButton.setEnabled(True)
-				self.microConnected = True
-				self.connectButton.setText("Disconnect")
-				self.connectionGroupBox.setEnabled(False)
-				self.devicePathLineEdit.setEnabled(False)
-				self.baudrateComboBox.setEnabled(False)
-				self.csvPathLineEdit.setEnabled(False)
-				self.initPlot()
-				self.initPlayground()
-			except (ValueError, FileNotFoundError, PermissionError, RuntimeError) as e:
-				QMessageBox.warning(
-					self, "Error", str(e), QMessageBox.Ok
-				)
-				self.connectButton.setEnabled(True)
-				return
+			except (ValueError, FileNotFoundError, IsADirectoryError, PermissionError, RuntimeError) as e:
+				self.abortConnect(str(e))
 			except Exception as e:
-				QMessageBox.warning(
-					self,
-					"Error",
-					"Unexpected exception occured:\n" + str(e),
-					QMessageBox.Ok,
-				)
-				self.onConnectButtonClick()
-				return
+				self.abortConnect("Unexpected exception occured:\n" + str(e))
 		else:
 			try:
 				self.deinitPlot()
@@ -239,15 +269,72 @@ class LabBox(QMainWindow, Ui_LabBox):
 				)
 				raise
 			self.disconnectMicro()
-			if self.csvPath:
-				self.csvFile.close()
 			self.connectButton.setEnabled(True)
 			self.connectButton.setText("Connect")
 			self.microConnected = False
-			self.connectionGroupBox.setEnabled(True)
-			self.devicePathLineEdit.setEnabled(True)
-			self.baudrateComboBox.setEnabled(True)
-			self.csvPathLineEdit.setEnabled(True)
+			self.enableConnectionPanel(True)
+
+	def onConnectProgress(self, attempt, attempts):
+		if self.sender() is not self.connector:
+			return
+		self.statusBar().showMessage(
+			"Connecting, attempt {} of {}...".format(attempt, attempts)
+		)
+
+	def onMicroConnected(self, cfgData):
+		"""
+		Finishes connection once handshake succeeded
+		:param cfgData: config announced by micro
+		:return:
+		"""
+		# signals of a cancelled connector may still be queued
+		if self.sender() is not self.connector:
+			return
+		self.connectTime = self.connector.elapsed
+		self.connector.wait()
+		self.connector = None
+		self.cfgData = cfgData
+		try:
+			self.configureComm()
+		except (OSError, RuntimeError) as e:
+			self.abortConnect(str(e))
+			return
+		except Exception as e:
+			self.abortConnect("Unexpected exception occured:\n" + str(e))
+			return
+		self.connectProgress.hide()
+		self.microConnected = True
+		self.connectButton.setText("Disconnect")
+		self.initPlot()
+		self.initPlayground()
+		self.statusBar().showMessage(
+			"Connected in {:.0f} ms".format(self.connectTime * 1000)
+		)
+
+	def onConnectFailed(self, message):
+		if self.sender() is self.connector:
+			self.abortConnect(message)
+
+	def abortConnect(self, message=None):
+		"""
+		Releases everything opened by unfinished connection and restores panel
+		:param message: error shown to user, if any
+		:return:
+		"""
+		if self.connector:
+			self.connector.wait()
+			self.connector = None
+		if self.port:
+			self.disconnectMicro()
+		self.connectProgress.hide()
+		self.statusBar().clearMessage()
+		self.connectButton.setText("Connect")
+		self.connectButton.setEnabled(True)
+		self.enableConnectionPanel(True)
+		if message:
+			QMessageBox.warning(
+				self, "Error", message, QMessageBox.Ok
+			)
 
 	def onChangePointsNumber(self):
 		pointsNumber = self.PointsNumberLineEdit.text()
@@ -257,132 +344,108 @@ class LabBox(QMainWindow, Ui_LabBox):
 			)
 			return
 		self.pointsNumber = int(pointsNumber)
-		self.pointsStack = np.arange(0, self.pointsNumber, 1)
-		for i in range(len(self.cfgData.namesList)):
-			if self.pointsNumber > len(self.plotStack[i]):
-				self.plotStack.append(deque(
-					list(islice(self.plotStack[i], 0, len(self.plotStack[i]))),
-					maxlen=self.pointsNumber,
-				))
-			else:
-				self.plotStack[i] = deque(
-					list(
-						islice(self.plotStack[i],
-							len(self.plotStack[i]) - self.pointsNumber,
-							len(self.plotStack[i]),
-						)
-					),
-					maxlen=self.pointsNumber,
-				)
+		if self.plotStack is not None:
+			self.plotStack.resize(self.pointsNumber)
+			self.timeStack.resize(self.pointsNumber)
+			self.gapStack.resize(self.pointsNumber)
+			self.renderPending = True
 
-		self.plotView.plot.setXRange(0, self.pointsNumber, padding=0, update=False)
+		if not Settings.byObject(self).timeAxis:
+			self.plotView.plot.setXRange(0, self.pointsNumber, padding=0, update=False)
+
+	def seekReplay(self, seconds):
+		port = getattr(self.port, "port", self.port)
+		if self.microConnected and isinstance(port, ReplayPort):
+			port.seek(port.tell() + seconds)
 
 	def connectMicro(self):
 		self.openPort()
-		self.configureComm()
+		self.connector = Connector(
+			self.port,
+			Settings.byObject(self).handshakeTimeout,
+			Settings.byObject(self).handshakeAttempts,
+		)
+		self.connector.progress.connect(self.onConnectProgress)
+		self.connector.connected.connect(self.onMicroConnected)
+		self.connector.failed.connect(self.onConnectFailed)
+		# second click cancels connection, the rest is locked until it's done
+		self.connectButton.setText("Cancel")
+		self.enableConnectionPanel(False)
+		self.connectProgress.show()
+		self.connector.start()
 
 	def openPort(self):
-		if self.serialRadioButton.isChecked():
-			devicePath = self.devicePathLineEdit.text()
-			if not devicePath:
-				raise ValueError("Field 'Device path' can't be empty!")
-			elif not os.access(devicePath, os.F_OK):
-				raise FileNotFoundError("No such device file!")
-			elif not os.access(devicePath, os.R_OK | os.W_OK):
+		devicePath = self.devicePathLineEdit.text()
+		if not devicePath:
+			raise ValueError("Field 'Device path' can't be empty!")
+		elif is_socket(devicePath):
+			pass
+		elif not os.access(devicePath, os.F_OK):
+			raise FileNotFoundError("No such device file!")
+		elif not os.access(devicePath, os.R_OK | os.W_OK):
+			raise PermissionError(
+				"Device file:\nRead and/or write permission denied!"
+			)
+		# transport is chosen once here, the rest doesn't care what it is
+		self.port = open_transport(
+			devicePath,
+			baudrate=int(self.baudrateComboBox.currentText()),
+			replay_speed=Settings.byObject(self).replaySpeed
+			if self.replaySpeed is None else self.replaySpeed,
+		)
+		if self.capturePath:
+			self.port = CapturePort(self.port, self.capturePath)
+		self.csvPath = self.csvPathLineEdit.text()
+		if self.csvPath:
+			if os.path.isdir(self.csvPath):
+				raise IsADirectoryError(
+					"Invalide path:\n" + self.csvPath + " is a directory!"
+				)
+			elif not os.path.isdir(os.path.dirname(self.csvPath)):
+				raise FileNotFoundError(
+					"Invalide path:\n" + self.csvPath + " does not exist!"
+				)
+			elif not os.access(os.path.dirname(self.csvPath), os.W_OK):
 				raise PermissionError(
-					"Device file:\nRead and/or write permission denied!"
+					"CSV file:\nRead and/or write permission denied!"
 				)
-			# init serial port
-			self.port = serial.Serial(
-				port=devicePath,
-				baudrate=int(self.baudrateComboBox.currentText()),
-				parity=serial.PARITY_NONE,
-				stopbits=serial.STOPBITS_ONE,
-				bytesize=serial.EIGHTBITS,
-				timeout=0.1,  # 100ms
-			)
-			self.csvPath = self.csvPathLineEdit.text()
-			if self.csvPath:
-				if not os.path.isdir(os.path.dirname(self.csvPath)):
-					raise FileNotFoundError(
-						"Invalide path:\n" + self.csvPath + " does not exist!"
-					)
-				elif not os.access(os.path.dirname(self.csvPath), os.W_OK):
-					raise PermissionError(
-						"CSV file:\nRead and/or write permission denied!"
-					)
-				else:
-					pass
-		elif self.usbRadioButton.isChecked():
-			pass
 
+	def packCommand(self, cmd, pg=None, data=None):
+		if pg:
+			cmd |= pg << 8 * 2
+		if data:
+			cmd |= data
+		return cmd.to_bytes(Cmd.SIZE, byteorder='little')
 
 	def write(self, cmd, pg=None, data=None):
-		if self.serialRadioButton.isChecked():
-			try:
-				if pg:
-					cmd |= pg << 8 * 2
-				if data:
-					cmd |= data
-				array = cmd.to_bytes(Cmd.SIZE, byteorder='little')
-				return self.port.write(array)
-			except serial.SerialTimeoutException:
-				raise RuntimeError("Timeout elapsed!")
-			except serial.SerialException as e:
-				raise RuntimeError("Unexpected SerialException occured!\n" + str(e))
-		elif self.usbRadioButton.isChecked():
-			pass
-
-	def read(self, size=1, raiseTimeout=True) -> bytes:
-		if self.serialRadioButton.isChecked():
-			try:
-				data = self.port.read(size=size)
-				if data is not None:
-					return data
-				elif raiseTimeout:
-					raise RuntimeError("Timeout elapsed!")
-			except serial.SerialException as e:
-				raise RuntimeError("Unexpected SerialException occured!\n" + str(e))
-		elif self.usbRadioButton.isChecked():
-			pass
+		return self.writelines([self.packCommand(cmd, pg, data)])
 
-	def readInt(
-		self, size=1, signed=False, raiseTimeout=True
-	) -> int:  # Could be changed when usb added
-		data = self.read(size=size, raiseTimeout=raiseTimeout)
-		return int.from_bytes(data, signed=signed, byteorder="little")
+	def writelines(self, commands):
+		try:
+			return self.port.writelines(commands)
+		except TimeoutError:
+			raise RuntimeError("Timeout elapsed!")
+		except OSError as e:
+			raise RuntimeError("Unexpected exception occured while writing!\n" + str(e))
 
 	def configureComm(self):
-		self.write(Cmd.PC_HELLO)
-		if self.readInt(size=4) != Cmd.CFG_START:
-			raise ValueError(f"No config start byte from micro was detected.")
-
-		self.cfgData.graphNumbers = self.readInt(size=1)
-		self.cfgData.maxVoltage = self.readInt(size=2, signed=True) * 1.1
-		self.cfgData.minVoltage = self.readInt(size=2, signed=True) * 1.1
-		self.cfgData.updateTime = self.readInt(size=1)
-		for i in range(self.cfgData.graphNumbers):
-			length = self.readInt()
-			data = self.read(size=length)
-			name = data.decode("utf-8")
-			self.cfgData.namesList.append(name)
-
 		if self.csvPath:
-			self.csvFile = open(self.csvPath, "w")
-			self.csvFile.writelines([", ".join(
-				sName for sName in self.cfgData.namesList), ", ", "time", "\n"])
-			
+			self.logWriter = open_log(self.csvPath, self.cfgData)
+			self.logWriter.start()
 
 	def disconnectMicro(self):
-		if self.serialRadioButton.isChecked():
-			if self.port.isOpen():
-				try:
-					self.write(Cmd.PC_BYE)
-				except Exception as e:
-					pass
-				self.port.close()
-		if self.usbRadioButton.isChecked():
-			pass
+		if self.reader:
+			self.reader.stop()
+			self.reader = None
+		if self.logWriter:
+			self.logWriter.close()
+			self.logWriter = None
+		if self.port.isOpen():
+			try:
+				self.write(Cmd.PC_BYE)
+			except Exception as e:
+				pass
+			self.port.close()
 
 	def initPlot(self):
 		self.plotView.plot.addLegend()
@@ -397,48 +460,92 @@ class LabBox(QMainWindow, Ui_LabBox):
 			self.plotView.traces.append(self.plotView.plot.plot(
 				pen=self.lineColors[i], name=self.cfgData.namesList[i]
 			))
-			self.plotStack.append(deque(maxlen=self.pointsNumber))
 		self.enableLeftPanel(True)
+		self.metrics = Metrics(self.metricsPath)
+		self.reader = Reader(self.port, self.cfgData, self.metrics)
+		self.reader.error.connect(self.onAcquisitionError)
+		# samples are kept in the type every announced format is decoded to
+		self.plotStack = RingBuffer(
+			self.cfgData.graphNumbers, self.pointsNumber, dtype=self.reader.queue.samples.dtype
+		)
+		# monotonic ns of every sample in plotStack
+		self.timeStack = RingBuffer(1, self.pointsNumber, dtype=np.int64)
+		# moments lost before every sample in plotStack, traces break there
+		self.gapStack = RingBuffer(1, self.pointsNumber, dtype=np.uint32)
+		self.reader.start()
 		self.plotTimer.timeout.connect(self.updatePlot)
-		self.plotTimer.start(self.cfgData.updateTime)
+		# repaint rate is independent of the rate frames arrive with
+		self.plotTimer.start(1000 // Settings.byObject(self).displayRate)
 
 	def updatePlot(self):
-		try:
-			if self.readInt(size=Cmd.SIZE, raiseTimeout=False) == Cmd.DATA_START:
-				k = 1
-				for i in range(self.cfgData.graphNumbers):
-					data = self.readInt(
-						size=2, signed=True, raiseTimeout=False
-					)
-					self.plotStack[i].append(data)
-					self.plotView.traces[i].setData(
-						self.pointsStack[: len(self.plotStack[i])],
-						self.plotStack[i],
+		# decoded frames are viewed in place and released once stored
+		for block, times, gaps in self.reader.queue.peek():
+			self.plotStack.extend(block)
+			self.timeStack.extend(times[:, np.newaxis])
+			self.gapStack.extend(gaps[:, np.newaxis])
+			self.renderPending = True
+			if self.logWriter:
+				try:
+					# log is written asynchronously, so it gets its own copy
+					self.logWriter.put(
+						block.copy(), self.reader.clock.seconds(times), gaps.copy()
 					)
-					if self.csvPath:
-						self.csvFile.write(str(data))
-						if k != self.cfgData.graphNumbers:
-							self.csvFile.write(", ")
-							k += 1
-						else:
-							self.csvFile.writelines([", ", "{:.2f}".format(self.timerValue), "\n"])
-
-				self.timerValue += self.plotTimer.interval() * 0.01
-		except RuntimeError as e:
-			self.onConnectButtonClick()
-			QMessageBox.warning(
-				self, "Error", str(e), QMessageBox.Ok
-			)
+				except RuntimeError as e:
+					self.reader.queue.release()
+					self.onAcquisitionError(str(e))
+					return
+		self.reader.queue.release()
+		# nothing to repaint while minimized or covered, samples are kept
+		if self.renderPending and not self.isMinimized() \
+				and self.windowHandle().isExposed():
+			self.renderPlot()
+		if self.metrics.due(Settings.byObject(self).metricsInterval):
+			self.reportMetrics()
+
+	def renderPlot(self):
+		start = time.perf_counter_ns()
+		self.plotView.updateTraces(
+			self.plotStack.view(), self.plotStack.total, self.plotStack.capacity,
+			self.timeStack.view()[0] if Settings.byObject(self).timeAxis else None,
+			self.gapStack.view()[0],
+			self.reader.clock.seconds
+		)
+		self.metrics.render_ns += time.perf_counter_ns() - start
+		self.metrics.renders += 1
+		self.renderPending = False
+
+	def reportMetrics(self):
+		gauges = {
+			"resyncs": self.reader.parser.resyncs,
+			"dropped": self.reader.parser.dropped,
+			"discarded": self.reader.parser.discarded,
+			"overflow": self.reader.acquisition.overflow,
+			"lost": self.reader.acquisition.lost,
+			"loss": self.reader.acquisition.loss,
+		}
+		if self.connectTime is not None:
+			gauges["connect_ms"] = self.connectTime * 1000
+		if self.logWriter:
+			gauges["queue"] = self.logWriter.depth
+			gauges["backpressure"] = self.logWriter.backpressure
+			gauges["log_dropped"] = self.logWriter.dropped
+		self.statusBar().showMessage(format_report(self.metrics.report(**gauges)))
+
+	def onAcquisitionError(self, message):
+		self.onConnectButtonClick()
+		QMessageBox.warning(
+			self, "Error", message, QMessageBox.Ok
+		)
 
 	def deinitPlot(self):
 		self.plotTimer.stop()
 		self.plotView.plot.legend.clear()
-		for i in range(self.cfgData.graphNumbers):
-			self.plotStack[i].clear()
-			self.plotView.traces[i].setData(
-				self.pointsStack[: len(self.plotStack[i])],
-				self.plotStack[i],
-			)
+		self.plotStack.clear()
+		self.timeStack.clear()
+		self.gapStack.clear()
+		self.plotView.clearTraces()
+		self.metrics.close()
+		self.statusBar().clearMessage()
 		self.enableLeftPanel(False)
 
 	def hideBaudrateField(self, state):
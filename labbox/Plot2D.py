@@ -1,11 +1,16 @@
+from .decimation import MinMaxDecimator
+
 from pyqtgraph.Qt import QtGui, QtCore
 import pyqtgraph as pg
+import numpy as np
 import sys
 
 class Plot2D(pg.GraphicsLayoutWidget):
 	def __init__(self, parent):		
 		super().__init__(parent)
 		self.traces = list()
+		self.decimator = MinMaxDecimator()
+		self.resetBreaks()
 
 		pg.setConfigOptions(antialias=True)
 		pg.setConfigOption('foreground', 'k')
@@ -14,3 +19,77 @@ class Plot2D(pg.GraphicsLayoutWidget):
 		self.plot.setMouseEnabled(x=False, y=False)
 		self.plot.hideButtons()
 		self.plot.showGrid(x=True, y=True)
+
+	def updateTraces(self, samples, total, capacity, times=None, gaps=None, seconds=None):
+		"""
+		Pushes samples to traces, reduced to min/max pairs of about a pixel wide buckets
+		:param samples: (traces, size) latest samples, oldest first
+		:param total: number of samples received since connect
+		:param capacity: number of points visible on x-axis
+		:param times: (size,) time of every sample, in seconds unless
+			seconds is given, x-axis shows sample numbers when not given
+		:param gaps: (size,) moments lost before every sample, traces are
+			not connected across them
+		:param seconds: converts times to seconds, only shown points and
+			the ends of the window are converted
+		:return:
+		"""
+		x, y = self.decimator.reduce(
+			samples, total, capacity, int(self.plot.vb.width())
+		)
+		connect = self.connections(x, gaps, total)
+		if times is not None and len(times):
+			x = times[x]
+			first, last = times[[0, -1]]
+			if seconds is not None:
+				x = seconds(x)
+				first, last = seconds(np.array([first, last]))
+			# window spans capacity samples at the rate they came so far
+			span = (last - first) * capacity / max(len(times) - 1, 1)
+			self.plot.setXRange(
+				first, max(first + span, last), padding=0, update=False
+			)
+		for trace, data in zip(self.traces, y):
+			trace.setData(x, data, connect=connect)
+
+	def resetBreaks(self):
+		# absolute indices of samples after a gap, found up to scanned
+		self.breaks = np.empty(0, dtype=np.int64)
+		self.scanned = 0
+
+	def connections(self, x, gaps, total):
+		"""
+		Gaps are looked for only in samples received since the previous call
+		:param x: positions of the points in the window
+		:param total: number of samples received since connect
+		:return: "all" or whether every point connects to the next one, which
+			it doesn't if a gap lies in between
+		"""
+		if gaps is None:
+			return "all"
+		first = total - len(gaps)
+		if total < self.scanned:
+			self.resetBreaks()
+		start = max(self.scanned, first)
+		found = np.flatnonzero(gaps[start - first:])
+		self.breaks = self.breaks[np.searchsorted(self.breaks, first):]
+		if len(found):
+			self.breaks = np.concatenate((self.breaks, found + start))
+		self.scanned = total
+		if not len(self.breaks):
+			return "all"
+		breaks = self.breaks - first
+		connect = np.ones(len(x), dtype=bool)
+		np.equal(
+			np.searchsorted(breaks, x[:-1], "right"),
+			np.searchsorted(breaks, x[1:], "right"),
+			out=connect[:-1]
+		)
+		return connect
+
+	def clearTraces(self):
+		self.decimator.reset()
+		self.resetBreaks()
+		for trace in self.traces:
+			self.plot.removeItem(trace)
+		self.traces.clear()
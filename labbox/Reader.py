@@ -0,0 +1,32 @@
+from .acquisition import Acquisition
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class Reader(QThread):
+	"""
+	Owns the opened port after handshake, reads and decodes data frames
+	continuously outside of the GUI thread into a preallocated queue
+	"""
+	error = pyqtSignal(str)
+
+	def __init__(self, port, cfgData, metrics, parent=None):
+		super().__init__(parent)
+		self.port = port
+		self.cfgData = cfgData
+		self.acquisition = Acquisition(port, cfgData, metrics)
+		self.parser = self.acquisition.parser
+		self.clock = self.acquisition.clock
+		self.queue = self.acquisition.queue
+
+	def run(self):
+		try:
+			while not self.isInterruptionRequested():
+				# blocks until at least one frame or timeout, then drains the rest
+				self.acquisition.poll()
+		except OSError as e:
+			self.error.emit("Connection lost!\n" + str(e))
+
+	def stop(self):
+		self.requestInterruption()
+		self.wait()
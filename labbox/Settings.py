@@ -15,22 +15,31 @@ class MetaSettings(type):
 					self.__dict__[key] = value
 
 	_instance = None
+	_data = None
 	root_path = os.path.dirname(__file__)
 	icons_folder = os.path.join(root_path, "icons")
 	gifs_folder = os.path.join(root_path, "gifs")
 	settings_path = os.path.join(root_path,
 		os.path.join("settings", "settings.json"))
-	with open(settings_path, "rb") as data_file:              # should the path be automatically generated?
-		_data = json.load(data_file)
-	if not _instance:
-		_instance = Wrapper(_data)
+
+	@staticmethod
+	def _load():
+		"""
+		Reads json on first access, importing the module doesn't touch the disk
+		:return:
+		"""
+		if MetaSettings._instance is None:
+			with open(MetaSettings.settings_path, "rb") as data_file:
+				MetaSettings._data = json.load(data_file)
+			MetaSettings._instance = MetaSettings.Wrapper(MetaSettings._data)
+		return MetaSettings._instance
 
 	def __getattr__(cls, name):
-		return getattr(MetaSettings._instance, name)
+		return getattr(MetaSettings._load(), name)
 
 	@staticmethod
 	def byObject(obj):
-		return getattr(MetaSettings._instance, type(obj).__name__)
+		return getattr(MetaSettings._load(), type(obj).__name__)
 
 	@staticmethod
 	def _update(dump, obj):
@@ -44,7 +53,7 @@ class MetaSettings(type):
 	@staticmethod
 	def saveSettings():
 		MetaSettings._data = MetaSettings._update(
-			MetaSettings._data, MetaSettings._instance
+			MetaSettings._data, MetaSettings._load()
 		)
 		with open("settings/settings.json", "w") as out_data_file:
 			json.dump(MetaSettings._data, out_data_file, indent=4, sort_keys=True)  # enable pretty printing
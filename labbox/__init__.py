@@ -1,3 +1,17 @@
-from .LabBox import LabBox
-from .Settings import Settings
-from .Plot2D import Plot2D
\ No newline at end of file
+import importlib
+
+# Qt classes are imported on first access, so headless tools and the
+# generator can use labbox submodules without loading PyQt5 and pyqtgraph
+_lazy = {
+	"LabBox": ".LabBox",
+	"Settings": ".Settings",
+	"Plot2D": ".Plot2D",
+}
+
+
+def __getattr__(name):
+	if name in _lazy:
+		value = getattr(importlib.import_module(_lazy[name], __name__), name)
+		globals()[name] = value
+		return value
+	raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,3 +1,4 @@
+import argparse
 import sys
 from PyQt5 import QtWidgets
 
@@ -6,12 +7,37 @@ from labbox.Settings import Settings
 
 
 def main():
-    app = QtWidgets.QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="LabBox GUI.")
+    parser.add_argument(
+        "--capture",
+        help="Dump raw bytes received from the device to a file,\n"
+             "it can be served back with 'labbox-generator --capture'",
+        dest="capture",
+    )
+    parser.add_argument(
+        "--metrics",
+        help="Append acquisition metrics to a file as JSON lines\n"
+             "every 'metricsInterval' seconds",
+        dest="metrics",
+    )
+    parser.add_argument(
+        "--replay-speed",
+        help="Playback speed of recordings entered as device path,\n"
+             "0 plays as fast as possible, 'replaySpeed' setting if omitted",
+        type=float,
+        dest="replay_speed",
+    )
+    # the rest is left to Qt
+    args, qtArgs = parser.parse_known_args()
+    if args.replay_speed is not None and args.replay_speed < 0:
+        parser.error("Replay speed can't be negative")
+    app = QtWidgets.QApplication(sys.argv[:1] + qtArgs)
 
     if sys.platform != "linux":
         app.setStyle(Settings.defaultStyle)
 
-    ui = LabBox()
+    ui = LabBox(capturePath=args.capture, metricsPath=args.metrics,
+                replaySpeed=args.replay_speed)
     ui.show()
 
     sys.exit(app.exec_())
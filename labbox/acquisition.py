@@ -0,0 +1,175 @@
+import time
+
+import numpy as np
+
+from labbox.protocol import FrameParser
+from labbox.timing import SampleClock
+
+
+class FrameQueue:
+    """
+    Single producer, single consumer queue of decoded frames, their times
+    and moments lost before them over preallocated arrays. The producer
+    decodes into free space in place and publishes it with commit(), the
+    consumer gets views of published frames with peek() and frees them
+    with release(). Each side only advances its own counter, so no locks
+    are needed.
+    """
+
+    def __init__(self, channels: int, capacity: int, dtype=np.int16):
+        self.capacity = capacity
+        self.samples = np.zeros((capacity, channels), dtype=dtype)
+        self.times = np.zeros(capacity, dtype=np.int64)
+        self.gaps = np.zeros(capacity, dtype=np.uint32)
+        # frames ever committed and released
+        self.head = 0
+        self.tail = 0
+        self._peeked = 0
+
+    def __len__(self) -> int:
+        return self.head - self.tail
+
+    def commit(self, count: int) -> None:
+        self.head += count
+
+    def peek(self) -> list:
+        """
+        :return: up to two (samples, times, gaps) views of published frames,
+            valid until release()
+        """
+        head = self.head
+        start = self.tail % self.capacity
+        count = head - self.tail
+        self._peeked = count
+        first = min(count, self.capacity - start)
+        segments = []
+        if first:
+            segments.append((self.samples[start:start + first], self.times[start:start + first],
+                             self.gaps[start:start + first]))
+        if count > first:
+            segments.append((self.samples[:count - first], self.times[:count - first],
+                             self.gaps[:count - first]))
+        return segments
+
+    def release(self) -> None:
+        self.tail += self._peeked
+        self._peeked = 0
+
+
+class Acquisition:
+    """
+    Streaming side of a connection: reads the port straight into the
+    parser's receive buffer and decodes frames and their times straight into
+    a FrameQueue. Buffers are allocated once, so steady state streaming
+    allocates nothing per frame. When the consumer falls behind and the
+    queue is full, newest frames are dropped and counted as overflow.
+
+    Frames dropped by overflow or lost on the way, as told by sequence
+    numbers, are marked as a gap before the next queued frame.
+    """
+
+    def __init__(self, port, cfg_data, metrics=None, queue_bytes: int = 1 << 24,
+                 chunk: int = 1 << 16):
+        self.port = port
+        self.metrics = metrics
+        self.chunk = chunk
+        self.parser = FrameParser(cfg_data.graphNumbers, capacity=2 * chunk,
+                                  features=cfg_data.features, block_length=cfg_data.blockLength,
+                                  update_time=cfg_data.updateTime, formats=cfg_data.formats)
+        self.clock = SampleClock(cfg_data.updateTime)
+        dtype = self.parser.sample_dtype
+        capacity = max(queue_bytes // (dtype.itemsize * cfg_data.graphNumbers + 8), chunk)
+        self.queue = FrameQueue(cfg_data.graphNumbers, capacity, dtype)
+        # frames of a single read are stamped together before being queued
+        self._stamps = np.empty(capacity, dtype=np.int64)
+        self._ticks = np.empty(capacity, dtype="<u4") if self.parser.ticks is not None else None
+        self._gaps = np.zeros(capacity, dtype=np.uint32)
+        self._discard = np.empty((chunk, cfg_data.graphNumbers), dtype=dtype)
+        self.overflow = 0
+        # frames dropped since the latest queued one
+        self._overflowed = 0
+
+    @property
+    def lost(self) -> int:
+        """
+        Frames sent by the device that never made it to the queue, exact if
+        sequence numbers are announced and estimated otherwise
+        """
+        parser = self.parser
+        return (parser.lost if parser.gaps is not None else parser.dropped) + self.overflow
+
+    @property
+    def loss(self) -> float:
+        """
+        Share of lost frames among all sent since connect
+        """
+        sent = self.parser.frames + self.lost - self.overflow
+        return self.lost / sent if sent else 0.0
+
+    def poll(self) -> int:
+        """
+        Waits for at least a frame or the port timeout and decodes everything received
+        :return: number of queued frames
+        """
+        waiting = self.port.in_waiting
+        received = self.parser.receive(
+            self.port, min(max(waiting, self.parser.dtype.itemsize), self.chunk)
+        )
+        # the newest frame of the read has just arrived
+        now = time.monotonic_ns()
+        start = time.perf_counter_ns()
+        count = self._decode(now)
+        if self.metrics is not None:
+            self.metrics.observe_backlog(waiting)
+            self.metrics.decode_ns += time.perf_counter_ns() - start
+            self.metrics.reads += 1
+            self.metrics.bytes += received
+            self.metrics.frames += count
+        return count
+
+    def _decode(self, now: int) -> int:
+        queue = self.queue
+        start = queue.head % queue.capacity
+        free = queue.capacity - len(queue)
+        first = min(free, queue.capacity - start)
+        count = 0
+        # free space wraps around the end of the queue at most once
+        # without sequence numbers gaps stay zero but for overflow
+        numbered = self.parser.gaps is not None
+        for start, space in ((start, first), (0, free - first)):
+            if not space:
+                break
+            ticks = self._ticks[count:count + space] if self._ticks is not None else None
+            gaps = self._gaps[count:count + space] if numbered else None
+            decoded = self.parser.parse_into(queue.samples[start:start + space], ticks, gaps)
+            count += decoded
+            if decoded < space:
+                break
+        if count:
+            gaps = self._gaps[:count]
+            gaps[0] += self._overflowed
+            stamps = self.clock.stamp(
+                count, now,
+                self._ticks[:count] if self._ticks is not None else None,
+                self._stamps[:count], gaps,
+            )
+            start = queue.head % queue.capacity
+            first = min(count, queue.capacity - start)
+            queue.times[start:start + first] = stamps[:first]
+            queue.times[:count - first] = stamps[first:]
+            queue.gaps[start:start + first] = gaps[:first]
+            queue.gaps[:count - first] = gaps[first:]
+            queue.commit(count)
+            if not numbered:
+                gaps[0] = 0
+            self._overflowed = 0
+        # consumer fell behind, frames that didn't fit are lost
+        lost = self.parser.lost
+        while True:
+            dropped = self.parser.parse_into(self._discard)
+            if not dropped:
+                break
+            self.overflow += dropped
+            self._overflowed += dropped
+        self._overflowed += self.parser.lost - lost
+        return count
@@ -0,0 +1,5 @@
+"""
+Benchmarks of the acquisition and render paths, run with python -m labbox.bench,
+of the startup time, run with python -m labbox.bench.startup, and of per frame
+allocations, run with python -m labbox.bench.allocations
+"""
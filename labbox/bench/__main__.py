@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+import argparse
+import itertools
+import json
+import logging
+import sys
+
+from labbox.bench.throughput import run_case
+from labbox.defines import Format
+from labbox.generator import FORMAT_NAMES
+
+# metrics where a lower value is better, all others are better when higher
+_LOWER_IS_BETTER = ("connect_ms", "resyncs", "discarded_bytes", "latency_ms",
+                    "cpu_percent", "max_rss_kib", "render_ms", "log_backpressure", "log_dropped",
+                    "lost_frames", "loss")
+
+
+def _parse_list(cast):
+    def parse(s: str) -> list:
+        try:
+            return [cast(x) for x in s.split(",")]
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid list: {s}")
+    return parse
+
+
+def _key(result: dict) -> tuple:
+    key = tuple(result.get(name) for name in ("channels", "rate", "points", "render", "log"))
+    # results saved before block mode, formats, sequence numbers and ticks
+    # existed were all per frame of int16, not numbered and without ticks
+    return key + (result.get("block_length", 0), result.get("format", "int16"),
+                  result.get("sequence", False), result.get("tick", False))
+
+
+def _flatten(result: dict, prefix: str = "") -> dict:
+    flat = {}
+    for name, value in result.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, prefix + name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + name] = value
+    return flat
+
+
+def compare(baseline: list, results: list, tolerance: float) -> int:
+    """
+    Prints metrics that got worse than baseline by more than tolerance
+    :return: number of regressions
+    """
+    base = {_key(result): _flatten(result) for result in baseline}
+    regressions = 0
+    for result in results:
+        old = base.get(_key(result))
+        if old is None:
+            continue
+        for name, value in _flatten(result).items():
+            if name in ("channels", "rate", "points", "duration", "frames") or not old.get(name):
+                continue
+            change = (value - old[name]) / abs(old[name])
+            worse = change > tolerance if name.startswith(_LOWER_IS_BETTER) else change < -tolerance
+            if worse:
+                regressions += 1
+                logging.warning("%s %s: %.4g -> %.4g (%+.0f%%)",
+                                _key(result), name, old[name], value, change * 100)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="End-to-end throughput and latency benchmark. Streams from labbox-generator\n"
+                    "through the parser, ring buffer, log writer and offscreen plot.",
+        epilog=(
+            "Examples:\n"
+            "  sweep channels and rates, save results:\n"
+            "    python -m labbox.bench -n 1,4,32 -r 1000,10000 -o results.json\n"
+            "  header overhead of single frames against blocks of 64:\n"
+            "    python -m labbox.bench -n 1 -r 10000 -l 0,64\n"
+            "  bytes per second of sample formats in blocks of 64:\n"
+            "    python -m labbox.bench -n 4 -r 1000 -l 64 -F int16,int8,delta16\n"
+            "  frames lost at high rates, counted by sequence numbers:\n"
+            "    python -m labbox.bench -n 16 -r 10000,50000 --sequence\n"
+            "  latency against the generator clock sent with every frame:\n"
+            "    python -m labbox.bench -n 4 -r 1000,10000 --tick\n"
+            "  include rendering and compare with a previous run:\n"
+            "    python -m labbox.bench --render -p 1000,1000000 --compare results.json\n"
+        ),
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("-n", "--channels", type=_parse_list(int), default="1,4,16,32",
+                        dest="channels", help="Channel counts to sweep")
+    parser.add_argument("-r", "--rates", type=_parse_list(float), default="100,1000,10000",
+                        dest="rates", help="Generator frame rates to sweep")
+    parser.add_argument("-p", "--points", type=_parse_list(int), default="1000",
+                        dest="points", help="Plot window sizes to sweep")
+    parser.add_argument("-l", "--block-lengths", type=_parse_list(int), default="0",
+                        dest="block_lengths", help="Frames per DATA_START to sweep, 0 for one")
+    parser.add_argument("-F", "--formats", type=_parse_list(str), default="int16", dest="formats",
+                        help="Generator sample formats of every signal to sweep: "
+                             + ", ".join(FORMAT_NAMES)
+                             + ",\ndelta formats are swept with block lengths only")
+    parser.add_argument("-t", "--duration", type=float, default=3.0, dest="duration",
+                        help="Seconds streamed per case")
+    parser.add_argument("--sequence", action="store_true", dest="sequence",
+                        help="Generator numbers frames, lost ones are counted exactly")
+    parser.add_argument("--tick", action="store_true", dest="tick",
+                        help="Generator sends its clock with every frame, latency is measured\n"
+                             "against it")
+    parser.add_argument("--render", action="store_true", dest="render",
+                        help="Also render through an offscreen Plot2D")
+    parser.add_argument("--log", choices=["csv", "lbr"], dest="log",
+                        help="Also write the stream to a log of given format")
+    parser.add_argument("-o", "--output", dest="output",
+                        help="Write results as JSON to the file instead of stdout")
+    parser.add_argument("--compare", dest="compare",
+                        help="Baseline JSON of a previous run, exits with 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1, dest="tolerance",
+                        help="Relative change of a metric considered a regression")
+    args = parser.parse_args()
+    for sample_format in args.formats:
+        if sample_format not in FORMAT_NAMES:
+            parser.error(f"Unsupported format: {sample_format}")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - [%(levelname)s] %(message)s")
+
+    results = []
+    for channels, rate, points, block_length, sample_format in itertools.product(
+            args.channels, args.rates, args.points, args.block_lengths, args.formats):
+        if FORMAT_NAMES[sample_format] & Format.DELTA and not block_length:
+            continue
+        result = run_case(channels, rate, points, args.duration, args.render, args.log,
+                          block_length=block_length, sample_format=sample_format,
+                          sequence=args.sequence, tick=args.tick)
+        logging.info("%d channels  %g Hz  %d points  block %d  %s: %.0f frames/s  %.0f B/s  "
+                     "lost: %d  loss: %.3f%%  latency p50: %.2f ms  cpu: %.0f%%",
+                     channels, rate, points, block_length, sample_format, result["frames_per_s"],
+                     result["bytes_per_s"], result["lost_frames"], result["loss"] * 100,
+                     result["latency_ms"].get("p50", float("nan")), result["cpu_percent"])
+        results.append(result)
+
+    text = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(baseline, results, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import logging
+import sys
+import tracemalloc
+
+import numpy as np
+
+from labbox.acquisition import Acquisition
+from labbox.defines import CfgData, Feature
+from labbox.generator import FORMAT_NAMES, synthesize
+from labbox.metrics import Metrics
+from labbox.ringbuffer import RingBuffer
+from labbox.transport import Transport
+
+SIGNALS = ["sin", "sqr", "tri", "saw"]
+
+
+class LoopPort(Transport):
+    """
+    In-memory device repeating the same frames forever, every read is
+    served by copying into the caller's buffer
+    """
+
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast("B")
+        count = 0
+        while count < len(view):
+            size = min(len(view) - count, len(self.data) - self.pos)
+            view[count:count + size] = self.data[self.pos:self.pos + size]
+            count += size
+            self.pos = (self.pos + size) % len(self.data)
+        return count
+
+    def write(self, data) -> int:
+        return len(data)
+
+    @property
+    def in_waiting(self) -> int:
+        return 1 << 16
+
+    def isOpen(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+def measure(channels: int, points: int, polls: int, chunk: int, features: int = 0,
+            block_length: int = 0, formats: list = None) -> dict:
+    """
+    Runs the acquisition path of LabBox, from port reads to the plot ring
+    buffers, under tracemalloc. The first half of the polls settles caches,
+    the second half is measured.
+    :param chunk: largest read in bytes
+    :return: frames and traced memory in bytes
+    """
+    signals = [SIGNALS[i % len(SIGNALS)] for i in range(channels)]
+    cfg_data = CfgData()
+    cfg_data.graphNumbers = channels
+    cfg_data.updateTime = 1
+    cfg_data.features = features
+    cfg_data.blockLength = block_length
+    cfg_data.formats = formats or []
+    # odd frame count, so reads never line up with frame boundaries
+    t = np.arange(10007 * max(block_length, 1)) / 1000
+    port = LoopPort(synthesize(signals, [1] * channels, t, -1000, 1000, features, block_length,
+                               formats))
+    acquisition = Acquisition(port, cfg_data, Metrics(), chunk=chunk)
+    queue = acquisition.queue
+    plot = RingBuffer(channels, points, queue.samples.dtype)
+    times = RingBuffer(1, points, dtype=np.int64)
+
+    def run(count: int) -> None:
+        for _ in range(count):
+            acquisition.poll()
+            for block, stamps, _ in queue.peek():
+                plot.extend(block)
+                times.extend(stamps[:, np.newaxis])
+            queue.release()
+
+    tracemalloc.start()
+    try:
+        run(polls // 2)
+        frames = acquisition.parser.frames
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        run(polls - polls // 2)
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "channels": channels,
+        "features": features,
+        "chunk": chunk,
+        "frames": acquisition.parser.frames - frames,
+        "growth_bytes": after - before,
+        "peak_bytes": peak - before,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Allocation check of the acquisition path. Streams frames from memory\n"
+                    "through reads, decoding, timestamps and plot buffers under tracemalloc.\n"
+                    "Steady state must neither grow memory nor allocate per frame, so the\n"
+                    "traced peak must not grow with the read size.",
+        epilog=(
+            "Examples:\n"
+            "  check 1, 4 and 8 channels:\n"
+            "    python -m labbox.bench.allocations\n"
+            "  blocks of 64 frames per DATA_START:\n"
+            "    python -m labbox.bench.allocations -l 64\n"
+            "  delta encoded blocks:\n"
+            "    python -m labbox.bench.allocations -l 64 -F delta16\n"
+            "  with device ticks:\n"
+            "    python -m labbox.bench.allocations --tick -o allocations.json\n"
+        ),
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("-n", "--channels", default="1,4,8", dest="channels",
+                        help="Comma separated channel counts")
+    parser.add_argument("-p", "--points", type=int, default=10000, dest="points",
+                        help="Plot ring buffer capacity")
+    parser.add_argument("--polls", type=int, default=200, dest="polls",
+                        help="Reads per measurement")
+    parser.add_argument("--chunk", type=int, default=1 << 16, dest="chunk",
+                        help="Read size in bytes, reads of 8 times more frames are compared with it")
+    parser.add_argument("--tick", action="store_true", dest="tick",
+                        help="Frames carry device ticks")
+    parser.add_argument("-l", "--block-length", type=int, default=0, dest="block_length",
+                        help="Frames per DATA_START, 0 for one without block mode")
+    parser.add_argument("--sequence", action="store_true", dest="sequence",
+                        help="Frames carry sequence numbers")
+    parser.add_argument("-F", "--format", choices=sorted(FORMAT_NAMES), default="int16",
+                        dest="format", help="Sample format of every signal")
+    parser.add_argument("--budget", type=int, default=4096, dest="budget",
+                        help="Allowed growth in bytes of memory while streaming and of\n"
+                             "the traced peak between the read sizes")
+    parser.add_argument("-o", "--output", dest="output",
+                        help="Write results as JSON to the file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - [%(levelname)s] %(message)s")
+
+    results = []
+    failed = False
+    features = (Feature.TICK if args.tick else 0) | (Feature.BLOCK if args.block_length else 0)
+    if args.sequence:
+        features |= Feature.SEQUENCE
+    if FORMAT_NAMES[args.format]:
+        features |= Feature.FORMAT
+    for channels in (int(value) for value in args.channels.split(",")):
+        formats = [FORMAT_NAMES[args.format]] * channels if features & Feature.FORMAT else None
+        # a per frame allocation makes the peak grow with the frames per read,
+        # numpy's own buffers for unaligned fields of packed frames are bounded
+        small, large = (
+            measure(channels, args.points, args.polls, chunk, features, args.block_length, formats)
+            for chunk in (args.chunk, 8 * args.chunk)
+        )
+        results += [small, large]
+        logging.info("%d channels: %d frames  growth: %d B  peak: %d B per %d B read, "
+                     "%d B per %d B read", channels, small["frames"] + large["frames"],
+                     max(small["growth_bytes"], large["growth_bytes"]),
+                     small["peak_bytes"], small["chunk"], large["peak_bytes"], large["chunk"])
+        if max(small["growth_bytes"], large["growth_bytes"]) > args.budget:
+            logging.error("%d channels: memory grows while streaming", channels)
+            failed = True
+        if large["peak_bytes"] - small["peak_bytes"] > args.budget:
+            logging.error("%d channels: allocates per frame", channels)
+            failed = True
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
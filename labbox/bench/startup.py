@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import logging
+import statistics
+import subprocess
+import sys
+
+# cumulative import time budgets in ms and modules entry points must not load
+TARGETS = {
+    "labbox.defines": (20, ("PyQt5", "pyqtgraph", "numpy", "serial")),
+    "labbox.generator": (250, ("PyQt5", "pyqtgraph", "serial")),
+    "labbox.record": (300, ("PyQt5", "pyqtgraph")),
+    "labbox.export": (300, ("PyQt5", "pyqtgraph", "serial")),
+    "labbox.__main__": (600, ()),
+}
+
+
+def import_times(code: str) -> dict:
+    """
+    Runs code in a fresh interpreter with -X importtime
+    :return: cumulative import time in us of every loaded module
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def measure(module: str, repeat: int, forbidden: tuple, top: int) -> dict:
+    # modules loaded by the interpreter itself aren't attributed to module
+    interpreter = import_times("pass")
+    runs = [import_times(f"import {module}") for _ in range(repeat)]
+    loaded = runs[0]
+    slowest = sorted(
+        ((name, statistics.median(run.get(name, 0) for run in runs)) for name in loaded
+         if name != module and "." not in name and name not in interpreter),
+        key=lambda item: -item[1],
+    )[:top]
+    return {
+        "module": module,
+        "import_ms": statistics.median(run[module] for run in runs) / 1000,
+        "forbidden": sorted({name.split(".")[0] for name in loaded} & set(forbidden)),
+        "slowest_ms": {name: value / 1000 for name, value in slowest},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Startup time budget check. Imports every entry point in a fresh\n"
+                    "interpreter with -X importtime and compares the time with its budget.",
+        epilog=(
+            "Examples:\n"
+            "  check all entry points:\n"
+            "    python -m labbox.bench.startup\n"
+            "  on a slow machine allow twice as much:\n"
+            "    python -m labbox.bench.startup --scale 2 -o startup.json\n"
+        ),
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("modules", nargs="*", default=list(TARGETS),
+                        help="Modules to check, all entry points by default")
+    parser.add_argument("-r", "--repeat", type=int, default=5, dest="repeat",
+                        help="Fresh interpreters per module, median is reported")
+    parser.add_argument("--scale", type=float, default=1.0, dest="scale",
+                        help="Multiplier of the budgets")
+    parser.add_argument("--top", type=int, default=5, dest="top",
+                        help="Number of slowest top level imports to report")
+    parser.add_argument("-o", "--output", dest="output",
+                        help="Write results as JSON to the file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - [%(levelname)s] %(message)s")
+
+    results = []
+    failed = False
+    for module in args.modules:
+        budget, forbidden = TARGETS.get(module, (float("inf"), ()))
+        result = measure(module, args.repeat, forbidden, args.top)
+        result["budget_ms"] = budget * args.scale
+        results.append(result)
+        logging.info("%s: %.1f ms (budget %.0f ms)  slowest: %s", module, result["import_ms"],
+                     result["budget_ms"], ", ".join(f"{name} {value:.1f} ms"
+                                                    for name, value in result["slowest_ms"].items()))
+        if result["import_ms"] > result["budget_ms"]:
+            logging.error("%s exceeds its startup budget", module)
+            failed = True
+        if result["forbidden"]:
+            logging.error("%s imports %s", module, ", ".join(result["forbidden"]))
+            failed = True
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from labbox.acquisition import Acquisition
+from labbox.metrics import Metrics
+from labbox.protocol import handshake
+from labbox.recording import open_log
+from labbox.ringbuffer import RingBuffer
+from labbox.transport import open_transport
+
+SIGNALS = ["sin", "sqr", "tri", "saw"]
+
+
+def start_generator(channels: int, rate: float, *extra: str):
+    """
+    Starts labbox-generator in a subprocess
+    :return: process and path of its pseudo serial device
+    """
+    signals = ";".join(SIGNALS[i % len(SIGNALS)] for i in range(channels))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "labbox.generator", "-b", "115200", "-s", signals,
+         "-f", ";".join(["1"] * channels), "-r", str(rate), *extra],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    for line in process.stderr:
+        match = re.search(r"Pseudo serial device: (\S+)", line)
+        if match:
+            # keep draining periodic reports so the pipe never fills up
+            threading.Thread(target=process.stderr.read, daemon=True).start()
+            return process, match.group(1)
+    raise RuntimeError("Generator exited before opening a device")
+
+
+class Renderer:
+    """
+    Offscreen Plot2D fed the same way LabBox feeds it
+    """
+    app = None
+
+    def __init__(self, channels: int, points: int):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt5.QtWidgets import QApplication
+        from labbox.Plot2D import Plot2D
+        if Renderer.app is None:
+            Renderer.app = QApplication.instance() or QApplication([])
+        self.plot = Plot2D(None)
+        self.plot.resize(1000, 400)
+        self.plot.show()
+        for _ in range(channels):
+            self.plot.traces.append(self.plot.plot.plot(pen="b"))
+        self.plot.plot.setXRange(0, points, padding=0)
+        self.times = []
+
+    def render(self, buffer: RingBuffer) -> None:
+        started = time.perf_counter()
+        self.plot.updateTraces(buffer.view(), buffer.total, buffer.capacity)
+        self.app.processEvents()
+        self.times.append(time.perf_counter() - started)
+
+    def close(self) -> None:
+        self.plot.close()
+        self.plot.deleteLater()
+
+
+def _percentiles(values, scale: float = 1.0) -> dict:
+    if not len(values):
+        return {}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99]) * scale
+    return {"p50": p50, "p90": p90, "p99": p99, "max": float(np.max(values)) * scale}
+
+
+def run_case(channels: int, rate: float, points: int, duration: float,
+             render: bool = False, log: str = None, display_rate: float = 30.0,
+             block_length: int = 0, sample_format: str = "int16", sequence: bool = False,
+             tick: bool = False) -> dict:
+    """
+    Streams from a fresh generator for duration seconds through the
+    acquisition queue, ring buffer and optionally a log writer and offscreen plot.
+    With ticks the generator sends its clock with every frame, latency of the
+    newest frame is when it was read against its emission on that clock,
+    relative to the frame read the fastest, as both clocks are aligned only
+    up to a transfer
+    :param log: None, "csv" or "lbr"
+    :param block_length: frames per DATA_START, 0 for one without block mode
+    :param sample_format: generator format of every signal, e.g. "int8" or "delta16"
+    :param sequence: generator numbers frames, so lost ones are counted exactly
+    :param tick: generator sends its clock, needed to measure latency
+    :return: measured metrics
+    """
+    generator, path = start_generator(
+        channels, rate, "--format", sample_format,
+        *(("--tick",) if tick else ()),
+        *(("-l", str(block_length)) if block_length else ()),
+        *(("--sequence",) if sequence else ())
+    )
+    port = open_transport(path)
+    directory = tempfile.TemporaryDirectory()
+    try:
+        connect = time.perf_counter()
+        cfg_data = handshake(port, timeout=3.0, attempts=3)
+        connect = time.perf_counter() - connect
+        origin = time.perf_counter()
+        metrics = Metrics()
+        acquisition = Acquisition(port, cfg_data, metrics)
+        parser, queue = acquisition.parser, acquisition.queue
+        buffer = RingBuffer(cfg_data.graphNumbers, points, queue.samples.dtype)
+        writer = None
+        if log:
+            writer = open_log(os.path.join(directory.name, "bench." + log), cfg_data)
+            writer.start()
+        renderer = Renderer(cfg_data.graphNumbers, points) if render else None
+
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        latencies = []
+        next_render = origin
+        while time.perf_counter() - origin < duration:
+            if not acquisition.poll():
+                continue
+            read = time.monotonic_ns()
+            now = time.perf_counter()
+            for block, times, gaps in queue.peek():
+                buffer.extend(block)
+                if writer:
+                    writer.put(block.copy(), acquisition.clock.seconds(times), gaps.copy())
+            if tick:
+                # device clock of the newest frame, aligned on the first one read
+                latencies.append(read - int(times[-1]))
+            queue.release()
+            if renderer and now >= next_render:
+                renderer.render(buffer)
+                next_render = now + 1 / display_rate
+        elapsed = time.perf_counter() - origin
+        finished = resource.getrusage(resource.RUSAGE_SELF)
+        if writer:
+            writer.close()
+        if renderer:
+            renderer.close()
+    finally:
+        port.close()
+        generator.kill()
+        generator.wait()
+        directory.cleanup()
+
+    latencies = np.array(latencies, dtype=np.int64)
+    if len(latencies):
+        latencies -= latencies.min()
+    result = {
+        "channels": channels,
+        "rate": rate,
+        "points": points,
+        "render": render,
+        "log": log,
+        "block_length": block_length,
+        "format": sample_format,
+        "sequence": sequence,
+        "tick": tick,
+        "duration": elapsed,
+        "connect_ms": connect * 1e3,
+        "frames": parser.frames,
+        "frames_per_s": parser.frames / elapsed,
+        "bytes_per_s": metrics.bytes / elapsed,
+        "resyncs": parser.resyncs,
+        "discarded_bytes": parser.discarded,
+        "overflow_frames": acquisition.overflow,
+        "lost_frames": acquisition.lost,
+        "loss": acquisition.loss,
+        "latency_ms": _percentiles(latencies, 1e-6),
+        "cpu_percent": 100 * (finished.ru_utime + finished.ru_stime
+                              - usage.ru_utime - usage.ru_stime) / elapsed,
+        "max_rss_kib": finished.ru_maxrss,
+    }
+    if renderer:
+        result["render_ms"] = _percentiles(renderer.times, 1e3)
+        result["fps"] = len(renderer.times) / elapsed
+    if writer:
+        result["log_backpressure"] = writer.backpressure
+        result["log_dropped"] = writer.dropped
+    return result
@@ -0,0 +1,126 @@
+import collections
+import queue
+import threading
+import time
+
+import numpy as np
+
+_CLOSE = object()
+
+
+class BlockWriter(threading.Thread):
+    """
+    Writes decoded sample blocks to a file in a background thread.
+    Blocks are passed through a bounded queue, formatted in bulk and
+    written in large chunks flushed by size or by time, whichever comes first.
+    Subclasses open the file and implement format().
+    """
+
+    def __init__(self, file, queue_size: int = 64, overflow_size: int = 1024,
+                 flush_size: int = 1 << 20, flush_interval: float = 1.0):
+        """
+        :param overflow_size: blocks kept aside while the queue is full, the
+            oldest ones are dropped beyond it
+        """
+        super().__init__(daemon=True)
+        self.file = file
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.overflow_size = overflow_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.overflow = collections.deque()
+        self.backpressure = 0
+        # frames of dropped blocks
+        self.dropped = 0
+        self.written = 0
+        self.error = None
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize() + len(self.overflow)
+
+    def put(self, samples: np.ndarray, times: np.ndarray, gaps: np.ndarray = None,
+            block: bool = False) -> None:
+        """
+        Queues a block for writing. Unless asked to block, when the queue is
+        full the block is kept aside and handed over with the next one that
+        finds free space, merged into a single block. The frames of dropped
+        blocks are added to the gap of the block after them.
+        :param samples: (frames, channels) array
+        :param times: (frames,) array of time values
+        :param gaps: (frames,) array of moments lost before every frame
+        :param block: wait for free space in the queue instead
+        """
+        if self.error:
+            raise RuntimeError("Log file:\n" + str(self.error))
+        if block:
+            self.queue.put((samples, times, gaps))
+            return
+        self.overflow.append((samples, times, gaps))
+        # the queue is filled only here, so it can't get full after the check
+        if self.queue.full():
+            self.backpressure += 1
+            if len(self.overflow) > self.overflow_size:
+                dropped, _, lost = self.overflow.popleft()
+                self.dropped += len(dropped)
+                if lost is not None:
+                    self.overflow[0][2][0] += len(dropped) + lost.sum()
+            return
+        if len(self.overflow) > 1:
+            block = (
+                np.concatenate([s for s, _, _ in self.overflow]),
+                np.concatenate([t for _, t, _ in self.overflow]),
+                None if gaps is None else np.concatenate([g for _, _, g in self.overflow]),
+            )
+        else:
+            block = self.overflow[0]
+        self.queue.put_nowait(block)
+        self.overflow.clear()
+
+    def format(self, samples: np.ndarray, times: np.ndarray, gaps: np.ndarray = None):
+        raise NotImplementedError
+
+    def run(self):
+        chunks = []
+        size = 0
+        closing = False
+        deadline = time.monotonic() + self.flush_interval
+        try:
+            while not closing:
+                try:
+                    block = self.queue.get(
+                        timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    block = None
+                if block is _CLOSE:
+                    closing = True
+                elif block is not None:
+                    chunk = self.format(*block)
+                    chunks.append(chunk)
+                    size += len(chunk)
+                if closing or size >= self.flush_size \
+                        or time.monotonic() >= deadline:
+                    if chunks:
+                        self.file.write(chunks[0][:0].join(chunks))
+                        self.file.flush()
+                        self.written += size
+                        chunks = []
+                        size = 0
+                    deadline = time.monotonic() + self.flush_interval
+        except OSError as e:
+            self.error = e
+        finally:
+            self.file.close()
+
+    def close(self) -> None:
+        """
+        Writes everything queued and closes the file
+        """
+        if not self.is_alive():
+            self.file.close()
+            return
+        for block in self.overflow:
+            self.queue.put(block)
+        self.overflow.clear()
+        self.queue.put(_CLOSE)
+        self.join()
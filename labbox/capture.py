@@ -0,0 +1,72 @@
+import struct
+import time
+
+MAGIC = b"LBXCAP\x00\x01"
+_CHUNK = struct.Struct("<QI")
+
+# A capture starts with MAGIC followed by chunks of raw received bytes, each
+# prefixed with its arrival time in ns since capture start and its length.
+
+
+class CapturePort:
+    """
+    Wraps an opened port and dumps every byte read from it, with arrival
+    time, to a capture file. Handshake is captured as well, so the file can
+    be served back by labbox-generator --capture.
+    """
+
+    def __init__(self, port, path: str):
+        self.port = port
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.start = time.monotonic_ns()
+
+    @property
+    def in_waiting(self) -> int:
+        return self.port.in_waiting
+
+    def read(self, size: int = 1) -> bytes:
+        data = self.port.read(size=size)
+        self._dump(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        size = self.port.readinto(buffer)
+        self._dump(memoryview(buffer).cast("B")[:size])
+        return size
+
+    def _dump(self, data) -> None:
+        if len(data):
+            self.file.write(_CHUNK.pack(time.monotonic_ns() - self.start, len(data)))
+            self.file.write(data)
+
+    def write(self, data: bytes) -> int:
+        return self.port.write(data)
+
+    def writelines(self, chunks) -> int:
+        return self.port.writelines(chunks)
+
+    def isOpen(self) -> bool:
+        return self.port.isOpen()
+
+    def close(self) -> None:
+        self.port.close()
+        self.file.close()
+
+
+def read_capture(path: str):
+    """
+    :return: list of (ns since capture start, bytes) chunks
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a LabBox capture")
+        data = f.read()
+    chunks = []
+    offset = 0
+    while offset + _CHUNK.size <= len(data):
+        moment, length = _CHUNK.unpack_from(data, offset)
+        offset += _CHUNK.size
+        chunks.append((moment, data[offset:offset + length]))
+        offset += length
+    return chunks
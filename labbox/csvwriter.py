@@ -0,0 +1,31 @@
+import numpy as np
+
+from labbox.blockwriter import BlockWriter
+
+
+class CsvWriter(BlockWriter):
+    """
+    Writes decoded sample blocks to a CSV file, one row per frame with
+    its time in seconds since the first frame and optionally the number
+    of moments lost before it
+    """
+
+    def __init__(self, path: str, names: list[str], dtype=np.int16, gaps: bool = False,
+                 **kwargs):
+        """
+        :param dtype: type of samples, floats are written with 9 significant digits
+        :param gaps: add a "lost" column after time
+        """
+        super().__init__(open(path, "w"), **kwargs)
+        self.gaps = gaps
+        self.file.writelines([", ".join(names), ", ", "time", ", lost" if gaps else "", "\n"])
+        sample = "%.9g" if np.dtype(dtype).kind == "f" else "%d"
+        columns = [sample] * len(names) + ["%.6f"] + (["%d"] if gaps else [])
+        self.row_format = ", ".join(columns) + "\n"
+
+    def format(self, samples: np.ndarray, times: np.ndarray, gaps: np.ndarray = None) -> str:
+        if self.gaps:
+            rows = np.column_stack((samples, times, np.zeros(len(times)) if gaps is None else gaps))
+        else:
+            rows = np.column_stack((samples, times))
+        return (self.row_format * len(rows)) % tuple(rows.ravel().tolist())
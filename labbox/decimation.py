@@ -0,0 +1,79 @@
+import numpy as np
+
+
+class MinMaxDecimator:
+    """
+    Reduces a window of samples to min/max pairs of fixed size buckets, so
+    that a trace has about two points per pixel and spikes stay visible.
+    Buckets are aligned to the absolute sample index, full buckets are
+    cached and only the newly completed ones are computed on every update.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.width = 0
+        self.low = 0
+        self.mins = None
+        self.maxs = None
+
+    def reduce(self, samples: np.ndarray, total: int, capacity: int, pixels: int):
+        """
+        :param samples: (channels, size) latest samples, oldest first
+        :param total: number of samples ever appended, the last one has
+            absolute index total - 1
+        :param capacity: maximum window size, defines the bucket width
+        :param pixels: plot width in pixels
+        :return: x positions relative to the window and (channels, points) y values
+        """
+        channels, size = samples.shape
+        width = -(-capacity // max(pixels, 1))
+        if width <= 2:
+            self.reset()
+            return np.arange(size), samples
+
+        first = total - size
+        low = -(-first // width)
+        high = total // width
+        if width != self.width or self.mins is None \
+                or not self.low <= low <= self.low + self.mins.shape[1] \
+                or self.low + self.mins.shape[1] > high:
+            self.width = width
+            self.low = low
+            self.mins = np.empty((channels, 0), dtype=samples.dtype)
+            self.maxs = np.empty((channels, 0), dtype=samples.dtype)
+
+        # drop buckets that left the window, compute the completed ones
+        drop = low - self.low
+        cached = self.low + self.mins.shape[1]
+        if cached < high:
+            start = cached * width - first
+            buckets = samples[:, start:start + (high - cached) * width].reshape(
+                channels, high - cached, width)
+            self.mins = np.concatenate((self.mins[:, drop:], buckets.min(axis=2)), axis=1)
+            self.maxs = np.concatenate((self.maxs[:, drop:], buckets.max(axis=2)), axis=1)
+        else:
+            self.mins = self.mins[:, drop:]
+            self.maxs = self.maxs[:, drop:]
+        self.low = low
+
+        starts = [np.arange(low, high) * width - first]
+        mins, maxs = [self.mins], [self.maxs]
+        # partially filled buckets at both ends of the window
+        head = min(low * width - first, size)
+        if head > 0:
+            starts.insert(0, np.zeros(1, dtype=int))
+            mins.insert(0, samples[:, :head].min(axis=1, keepdims=True))
+            maxs.insert(0, samples[:, :head].max(axis=1, keepdims=True))
+        tail = high * width - first
+        if tail < size and tail >= max(head, 0):
+            starts.append(np.array([tail]))
+            mins.append(samples[:, tail:].min(axis=1, keepdims=True))
+            maxs.append(samples[:, tail:].max(axis=1, keepdims=True))
+
+        x = np.repeat(np.concatenate(starts), 2)
+        y = np.empty((channels, x.size), dtype=samples.dtype)
+        y[:, 0::2] = np.concatenate(mins, axis=1)
+        y[:, 1::2] = np.concatenate(maxs, axis=1)
+        return x, y
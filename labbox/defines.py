@@ -7,6 +7,41 @@ class Cmd:
 	PC_BYE = 0xFF << 8 * (SIZE -1)
 
 
+class Feature:
+	"""
+	Optional protocol features a device announces in the low bytes of
+	CFG_START, devices announcing none send plain CFG_START
+	"""
+	MASK = (1 << 8 * (Cmd.SIZE - 1)) - 1
+	# every data frame carries u32 device clock in us after DATA_START
+	TICK = 0x01
+	# a DATA_START header is followed by u16 sample count and that many
+	# samples of every signal, CFG_START block ends with u16 max count
+	BLOCK = 0x02
+	# signals are sent in their own sample formats, CFG_START block ends
+	# with a Format byte of every signal
+	FORMAT = 0x04
+	# every data frame carries u32 index of its first moment since stream
+	# start, wrapping around, after the other fields of its header
+	SEQUENCE = 0x08
+
+
+class Format:
+	"""
+	Sample formats a device announces per signal with Feature.FORMAT,
+	signals of devices announcing none are INT16
+	"""
+	INT16 = 0x00
+	INT8 = 0x01
+	INT32 = 0x02
+	FLOAT32 = 0x03
+	TYPE = 0x0F
+	# integer samples of the signal follow fixed size samples of a block as
+	# zigzag varint differences to the previous moment, the first moment of
+	# every block is sent as a difference to 0, needs Feature.BLOCK
+	DELTA = 0x80
+
+
 class Playground:
 	MODE_1 = 0xD1
 	MODE_2 = 0xD2
@@ -24,3 +59,8 @@ class CfgData:
 		self.maxVoltage = 0
 		self.minVoltage = 0
 		self.updateTime = 0
+		self.features = 0
+		# max samples per DATA_START if Feature.BLOCK is announced
+		self.blockLength = 0
+		# Format of every signal if Feature.FORMAT is announced
+		self.formats = []
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+import argparse
+import os
+
+from labbox.csvwriter import CsvWriter
+from labbox.recording import Recording
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Converts a LabBox recording to CSV.",
+        epilog=(
+            "Examples:\n"
+            "  write capture.csv next to the recording:\n"
+            "    labbox-export capture.lbr\n"
+        ),
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("recording", help="Path to the recording")
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="Path to the CSV file, defaults to the recording path with .csv extension",
+        dest="output",
+    )
+    parser.add_argument(
+        "-c",
+        "--chunk",
+        help="Number of frames converted at once",
+        type=int,
+        default=1 << 16,
+        dest="chunk",
+    )
+    args = parser.parse_args()
+    output = args.output or os.path.splitext(args.recording)[0] + ".csv"
+
+    recording = Recording(args.recording)
+    gaps = recording.gaps is not None
+    writer = CsvWriter(output, recording.cfgData.namesList, recording.samples.dtype, gaps)
+    writer.start()
+    for start in range(0, len(recording), args.chunk):
+        frames = recording.frames[start:start + args.chunk]
+        writer.put(frames["samples"], frames["time"], frames["lost"] if gaps else None, block=True)
+    writer.close()
+    if writer.error:
+        raise SystemExit(f"Failed to write {output}: {writer.error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,29 @@
 #!/usr/bin/env python3
 import argparse
+import json
 import logging
-import math
 import os
 import pty
-from time import sleep
+import selectors
+import time
+import tty
 
-from labbox.defines import Cmd
+import numpy as np
+
+from labbox.capture import read_capture
+from labbox.defines import Cmd, Feature, Format
+from labbox.protocol import DATA_MARKER, frame_dtype, sample_dtype, sample_types
 
 VALID_SIGNALS = {"sin", "sqr", "tri", "saw"}
+FORMAT_NAMES = {
+    "int8": Format.INT8,
+    "int16": Format.INT16,
+    "int32": Format.INT32,
+    "float32": Format.FLOAT32,
+    "delta8": Format.INT8 | Format.DELTA,
+    "delta16": Format.INT16 | Format.DELTA,
+    "delta32": Format.INT32 | Format.DELTA,
+}
 
 def _parse_signals(s: str) -> list[str]:
     parts = s.split(";")
@@ -27,38 +42,498 @@ def _parse_freqs(s: str) -> list[int]:
             raise argparse.ArgumentTypeError("Frequency must be in [1, 10]")
     return parts
 
+def _parse_formats(s: str) -> list[int]:
+    parts = s.split(";")
+    for name in parts:
+        if name not in FORMAT_NAMES:
+            raise argparse.ArgumentTypeError(f"Unsupported format: {name}")
+    return [FORMAT_NAMES[name] for name in parts]
+
+def _parse_rate(s: str) -> float:
+    try:
+        rate = float(s)
+    except ValueError:
+        raise argparse.ArgumentTypeError("Rate must be a number")
+    if not 0 < rate <= 50000:
+        raise argparse.ArgumentTypeError("Rate must be in (0, 50000]")
+    return rate
+
+def _per_device(parse):
+    """
+    Wraps an option parser so ',' separates values of different devices
+    """
+    def parse_groups(s: str) -> list:
+        return [parse(group) for group in s.split(",")]
+    return parse_groups
+
+def _spread(groups: list, devices: int, name: str) -> list:
+    if len(groups) == 1:
+        return groups * devices
+    if len(groups) != devices:
+        raise argparse.ArgumentTypeError(
+            f"Got {len(groups)} {name} group(s) for {devices} device(s)"
+        )
+    return groups
+
 def _validate_pairing(signals: list[str], freqs: list[int]) -> None:
     if len(signals) != len(freqs):
         raise argparse.ArgumentTypeError(
             f"Got {len(signals)} signal(s) but {len(freqs)} frequency value(s)"
         )
 
-def sqr_func(freq: int, t: float, min_val: int, max_val: int) -> bytes:
+def sqr_func(freq: int, t: np.ndarray, min_val: int, max_val: int) -> np.ndarray:
     p = 1.0 / freq
-    value = max_val if (t % p) > (p / 2.0) else min_val
-    return int(value).to_bytes(2, signed=True, byteorder="little")
+    return np.where((t % p) > (p / 2.0), max_val, min_val)
 
-def tri_func(freq: int, t: float, min_val: int, max_val: int) -> bytes:
+def tri_func(freq: int, t: np.ndarray, min_val: int, max_val: int) -> np.ndarray:
     p = 1.0 / freq
     tr = t % p
     span = max_val - min_val
-    if tr <= p / 2.0:
-        value = int((2 * span * tr) / p) + min_val
-    else:
-        value = int((2 * span * (p - tr)) / p) + min_val
-    return int(value).to_bytes(2, signed=True, byteorder="little")
+    value = np.where(tr <= p / 2.0, 2 * span * tr / p, 2 * span * (p - tr) / p)
+    return value.astype(np.int32) + min_val
 
-def saw_func(freq: int, t: float, min_val: int, max_val: int) -> bytes:
+def saw_func(freq: int, t: np.ndarray, min_val: int, max_val: int) -> np.ndarray:
     p = 1.0 / freq
     tr = t % p
-    value = int(((max_val - min_val) * tr) / p) + min_val
-    return int(value).to_bytes(2, signed=True, byteorder="little")
+    return (((max_val - min_val) * tr) / p).astype(np.int32) + min_val
 
-def sin_func(freq: int, t: float, min_val: int, max_val: int) -> bytes:
+def sin_func(freq: int, t: np.ndarray, min_val: int, max_val: int) -> np.ndarray:
     amp = (max_val - min_val) / 2.0
     mid = (max_val + min_val) / 2.0
-    value = int(math.sin(2.0 * math.pi * freq * t) * amp + mid)
-    return int(value).to_bytes(2, signed=True, byteorder="little")
+    return (np.sin(2.0 * np.pi * freq * t) * amp + mid).astype(np.int32)
+
+SIGNAL_FUNCS = {"sin": sin_func, "sqr": sqr_func, "tri": tri_func, "saw": saw_func}
+
+def encode_deltas(values: np.ndarray) -> tuple:
+    """
+    Encodes samples of every block as zigzag varint differences to the
+    previous moment, signal by signal
+    :param values: (blocks, moments, signals) integer samples
+    :return: bytes of all blocks and (blocks,) byte count of every block
+    """
+    diffs = np.diff(values.astype(np.int64), axis=1, prepend=0).transpose(0, 2, 1)
+    zigzag = ((diffs << 1) ^ (diffs >> 63)).astype(np.uint64).reshape(len(values), -1)
+    lengths = np.ones(zigzag.shape, dtype=np.int64)
+    for groups in range(1, 10):
+        lengths += zigzag >= np.uint64(1 << 7 * groups)
+    places = np.arange(10)
+    data = (zigzag[..., np.newaxis] >> (7 * places).astype(np.uint64)) & np.uint64(0x7F)
+    # every byte but the last one of a varint has the high bit set
+    data |= (places < lengths[..., np.newaxis] - 1).astype(np.uint64) << np.uint64(7)
+    data = data[places < lengths[..., np.newaxis]].astype(np.uint8)
+    return data.tobytes(), lengths.sum(axis=1)
+
+def synthesize(signals: list[str], freqs: list[int], t: np.ndarray,
+               min_val: int, max_val: int, features: int = 0, block_length: int = 0,
+               formats: list[int] = None, first: int = 0) -> bytes:
+    """
+    Builds DATA_START frames for every moment in t at once, in block mode
+    len(t) must be a multiple of block_length. Integer signals are limited
+    to the range of their format.
+    :param first: index of the first moment since stream start, frames are
+        numbered from it if Feature.SEQUENCE
+    """
+    types = sample_types(len(signals), formats)
+    values = np.empty((len(t), len(signals)), dtype=sample_dtype(formats))
+    for i, (s, f) in enumerate(zip(signals, freqs)):
+        low, high = min_val, max_val
+        if np.dtype(types[i]).kind == "i":
+            info = np.iinfo(types[i])
+            low, high = max(low, info.min), min(high, info.max)
+        values[:, i] = SIGNAL_FUNCS[s](int(f), t, low, high)
+    dtype = frame_dtype(len(signals), features, block_length, formats)
+    if features & Feature.BLOCK:
+        frames = np.empty(len(t) // block_length, dtype=dtype)
+        frames["count"] = block_length
+        values = values.reshape(len(frames), block_length, len(signals))
+        # a block is stamped with its last moment
+        moments = t[block_length - 1::block_length]
+    else:
+        frames = np.empty(len(t), dtype=dtype)
+        moments = t
+    if features & Feature.SEQUENCE:
+        # index of the first moment of every frame
+        step = block_length if features & Feature.BLOCK else 1
+        frames["sequence"] = (first + np.arange(len(frames)) * step) & 0xFFFFFFFF
+    delta = [i for i, fmt in enumerate(formats or []) if fmt & Format.DELTA]
+    fixed = [i for i in range(len(signals)) if i not in delta]
+    samples = frames["samples"]
+    if samples.dtype.names:
+        for name in samples.dtype.names:
+            samples[name] = values[..., int(name[1:])]
+    else:
+        samples[...] = values[..., fixed]
+    frames["header"] = Cmd.DATA_START
+    if features & Feature.TICK:
+        # device clock in us, wraps around like a free running timer
+        frames["tick"] = (moments * 1e6).astype(np.int64) & 0xFFFFFFFF
+    if not delta:
+        return frames.tobytes()
+    payload, sizes = encode_deltas(values[..., delta])
+    frames["size"] = sizes
+    # differences follow the fixed size part of every block
+    head = frames.tobytes()
+    parts = []
+    offset = 0
+    for i, size in enumerate(sizes.tolist()):
+        parts.append(head[i * dtype.itemsize:(i + 1) * dtype.itemsize])
+        parts.append(payload[offset:offset + size])
+        offset += size
+    return b"".join(parts)
+
+def write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+def config_block(signals: list[str], min_val: int, max_val: int, update_time: int,
+                 features: int = 0, block_length: int = 0, formats: list[int] = None) -> bytes:
+    arr = (Cmd.CFG_START | features).to_bytes(4, byteorder="little")
+    arr += len(signals).to_bytes(1, byteorder="little")
+    arr += max_val.to_bytes(2, byteorder="little", signed=True)
+    arr += min_val.to_bytes(2, byteorder="little", signed=True)
+    arr += update_time.to_bytes(1, byteorder="little")
+    for s in signals:
+        arr += len(s).to_bytes(1, byteorder="little")
+        for ch in s:
+            arr += ord(ch).to_bytes(1, byteorder="little")
+    if features & Feature.BLOCK:
+        arr += block_length.to_bytes(2, byteorder="little")
+    if features & Feature.FORMAT:
+        arr += bytes(formats)
+    return arr
+
+class Stream:
+    """
+    Paces frames against monotonic deadlines: frame i is due at
+    start + i / rate, so write and compute time never accumulate into drift.
+    When late, every overdue frame is sent in one batch to catch up.
+    In block mode moments are sent in full blocks only.
+    """
+
+    def __init__(self, signals: list[str], freqs: list[int], rate: float, block: int,
+                 min_val: int, max_val: int, jitter: bool = False, features: int = 0,
+                 block_length: int = 0, formats: list[int] = None):
+        self.signals = signals
+        self.freqs = freqs
+        self.rate = rate
+        self.min_val = min_val
+        self.max_val = max_val
+        self.features = features
+        self.block_length = block_length
+        self.formats = formats
+        # bytes per DATA_START, averaged over the latest batch for delta encoded signals
+        self.frame_size = frame_dtype(len(signals), features, block_length, formats).itemsize
+        self.sized = any(fmt & Format.DELTA for fmt in formats or [])
+        # moments per DATA_START, batches are made of whole frames
+        self.moments = block_length if features & Feature.BLOCK else 1
+        self.block = -(-block // self.moments) * self.moments
+        # never send more than a tenth of a second at once while catching up
+        self.max_batch = max(self.block, int(rate / 10) // self.moments * self.moments)
+        self.start = None
+        self.sent = 0
+        self.jitter = [] if jitter else None
+
+    @property
+    def update_time(self) -> int:
+        """
+        Frame interval in ms as announced in config, a byte can't express
+        intervals below 1 ms or above 255 ms
+        """
+        return max(1, min(255, round(1000 / self.rate)))
+
+    def config(self) -> bytes:
+        return config_block(self.signals, self.min_val, self.max_val, self.update_time,
+                            self.features, self.block_length, self.formats)
+
+    def begin(self) -> None:
+        self.start = time.perf_counter_ns()
+        self.sent = 0
+
+    def deadline(self) -> int:
+        """
+        :return: perf_counter_ns moment when the next batch is due
+        """
+        return self.start + int((self.sent + self.block - 1) * 1e9 / self.rate)
+
+    def produce(self, now: int) -> bytes:
+        """
+        :return: frames due at now, empty if the next batch isn't due yet
+        """
+        due = int((now - self.start) * self.rate / 1e9) + 1
+        count = min(due - self.sent, self.max_batch)
+        count -= count % self.moments
+        if count < self.block:
+            return b""
+        t = (self.sent + np.arange(count)) / self.rate
+        first = self.sent
+        self.sent += count
+        if self.jitter is not None:
+            self.jitter.append((now, count))
+        data = synthesize(self.signals, self.freqs, t, self.min_val, self.max_val, self.features,
+                          self.block_length, self.formats, first)
+        if self.sized:
+            self.frame_size = len(data) * self.moments // count
+        return data
+
+    def jitter_report(self) -> str:
+        """
+        Distribution of intervals between consecutive frames leaving the
+        generator since the previous report
+        """
+        if not self.jitter:
+            return "no frames"
+        moments, counts = np.array(self.jitter).T
+        self.jitter = [self.jitter[-1]]
+        intervals = np.diff(np.repeat(moments, counts)) / 1e3
+        if not len(intervals):
+            return "no frames"
+        p50, p90, p99 = np.percentile(intervals, [50, 90, 99])
+        return (f"inter-frame us: target {1e6 / self.rate:.1f}  mean {intervals.mean():.1f}  "
+                f"p50 {p50:.1f}  p90 {p90:.1f}  p99 {p99:.1f}  max {intervals.max():.1f}")
+
+def parse_config(data: bytes):
+    """
+    Splits the CFG_START block off the beginning of data
+    :return: signal names, announced features, block length, formats and
+        length of the block
+    """
+    start = int.from_bytes(data[:Cmd.SIZE], byteorder="little")
+    if start & ~Feature.MASK != Cmd.CFG_START:
+        raise ValueError("Capture doesn't start with CFG_START")
+    features = start & Feature.MASK
+    names = []
+    offset = Cmd.SIZE + 6
+    for _ in range(data[Cmd.SIZE]):
+        length = data[offset]
+        names.append(data[offset + 1:offset + 1 + length].decode("utf-8"))
+        offset += 1 + length
+    block_length = 0
+    if features & Feature.BLOCK:
+        block_length = int.from_bytes(data[offset:offset + 2], byteorder="little")
+        offset += 2
+    formats = None
+    if features & Feature.FORMAT:
+        formats = list(data[offset:offset + len(names)])
+        offset += len(names)
+    return names, features, block_length, formats, offset
+
+class CaptureStream:
+    """
+    Serves bytes captured from a real device with LabBox --capture: answers
+    with the recorded CFG_START block and replays the following bytes with
+    their original timing scaled by speed (0 sends everything at once).
+    """
+    jitter = None
+
+    def __init__(self, path: str, speed: float = 1.0):
+        chunks = read_capture(path)
+        data = b"".join(chunk for _, chunk in chunks)
+        self.signals, features, block_length, formats, length = parse_config(data)
+        self._config = data[:length]
+        # drop config bytes from the chunks, data timing starts after it
+        self.chunks = []
+        for moment, chunk in chunks:
+            if length >= len(chunk):
+                length -= len(chunk)
+                continue
+            self.chunks.append((moment, chunk[length:]))
+            length = 0
+        self.origin = self.chunks[0][0] if self.chunks else 0
+        self.speed = speed
+        # fixed size part only if signals are delta encoded
+        self.frame_size = frame_dtype(len(self.signals), features, block_length, formats).itemsize
+        self.sized = any(fmt & Format.DELTA for fmt in formats or [])
+        self.moments = block_length if features & Feature.BLOCK else 1
+        self.start = None
+        self.position = 0
+        self.sent = 0
+
+    def config(self) -> bytes:
+        return self._config
+
+    def begin(self) -> None:
+        self.start = time.perf_counter_ns()
+        self.position = 0
+        self.sent = 0
+
+    def _due_at(self, moment: int) -> int:
+        if not self.speed:
+            return self.start
+        return self.start + int((moment - self.origin) / self.speed)
+
+    def deadline(self) -> int:
+        if self.position >= len(self.chunks):
+            return self.start + (1 << 62)
+        return self._due_at(self.chunks[self.position][0])
+
+    def produce(self, now: int) -> bytes:
+        end = self.position
+        while end < len(self.chunks) and self._due_at(self.chunks[end][0]) <= now:
+            end += 1
+        data = b"".join(chunk for _, chunk in self.chunks[self.position:end])
+        self.position = end
+        self.sent += len(data) // self.frame_size * self.moments
+        return data
+
+class Faults:
+    """
+    Injects transport faults into produced frames: dropped bytes, corrupted
+    DATA_START headers, bursts and stalls. Random choices come from a seeded
+    generator, so runs are reproducible, and every injected fault is written
+    as a JSON line to the fault log when one is given.
+    """
+
+    def __init__(self, seed: int, drop_prob: float = 0.0, corrupt_prob: float = 0.0,
+                 burst: int = 0, stall_rate: float = 0.0, stall_ms: float = 0.0,
+                 log=None, name: str = ""):
+        self.rng = np.random.default_rng(seed)
+        self.drop_prob = drop_prob
+        self.corrupt_prob = corrupt_prob
+        self.burst = burst
+        self.stall_rate = stall_rate
+        self.stall_ns = int(stall_ms * 1e6)
+        self.log = log
+        self.name = name
+        self.counts = {"drop": 0, "corrupt": 0, "burst": 0, "stall": 0}
+        self.begin(time.perf_counter_ns())
+
+    def begin(self, now: int) -> None:
+        self.start = now
+        self.stall_end = 0
+        self.next_stall = self._next_stall(now)
+
+    def _next_stall(self, now: int) -> int:
+        if not self.stall_rate:
+            return None
+        return now + int(self.rng.exponential(1e9 / self.stall_rate))
+
+    def _record(self, now: int, fault: str, **details) -> None:
+        self.counts[fault] += 1
+        if self.log:
+            self.log.write(json.dumps({
+                "time": (now - self.start) / 1e9, "device": self.name, "fault": fault, **details
+            }) + "\n")
+
+    def stalled(self, now: int) -> bool:
+        if self.next_stall is not None and now >= self.next_stall:
+            self.stall_end = now + self.stall_ns
+            self.next_stall = self._next_stall(self.stall_end)
+            self._record(now, "stall", duration_ms=self.stall_ns / 1e6)
+        return now < self.stall_end
+
+    def apply(self, now: int, data: bytes, first: int, frame_size: int,
+              sized: bool = False) -> bytes:
+        """
+        :param first: index of the first frame in data since stream start
+        :param sized: frames differ in size, so they're found by their markers
+        """
+        raw = np.frombuffer(data, dtype=np.uint8)
+        if sized:
+            starts = _marker_offsets(raw)
+        else:
+            starts = np.arange(len(data) // frame_size) * frame_size
+        if self.burst:
+            self._record(now, "burst", frame=first, frames=len(starts))
+        if not self.corrupt_prob and not self.drop_prob:
+            return data
+        raw = raw.copy()
+        if self.corrupt_prob:
+            for i in np.flatnonzero(self.rng.random(len(starts)) < self.corrupt_prob):
+                offset = int(starts[i]) + int(self.rng.integers(Cmd.SIZE))
+                raw[offset] ^= int(self.rng.integers(1, 256))
+                self._record(now, "corrupt", frame=first + int(i))
+        if self.drop_prob:
+            dropped = self.rng.random(raw.size) < self.drop_prob
+            for offset in np.flatnonzero(dropped):
+                # bytes before the first marker count to the first frame
+                i = int(np.searchsorted(starts, offset, side="right")) - 1
+                start = int(starts[i]) if i >= 0 else 0
+                self._record(now, "drop", frame=first + max(i, 0), offset=int(offset) - start)
+            raw = raw[~dropped]
+        return raw.tobytes()
+
+def _marker_offsets(raw: np.ndarray) -> np.ndarray:
+    """
+    :return: offsets of every DATA_START marker in raw bytes
+    """
+    end = max(len(raw) - Cmd.SIZE + 1, 0)
+    found = raw[:end] == DATA_MARKER[0]
+    for i in range(1, Cmd.SIZE):
+        found &= raw[i:end + i] == DATA_MARKER[i]
+    return np.flatnonzero(found)
+
+class Device:
+    """
+    Pseudo serial device served by the generator: answers PC_HELLO with its
+    config, streams until PC_BYE and waits for the next PC_HELLO. Output is
+    non-blocking, frames the host doesn't read in time are dropped as a
+    real device would do once its UART buffer is full.
+    """
+    max_pending = 1 << 20
+
+    def __init__(self, stream: Stream, faults: Faults = None):
+        self.stream = stream
+        self.faults = faults
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        os.set_blocking(self.master, False)
+        self.path = os.ttyname(self.slave)
+        self.streaming = False
+        self.incoming = b""
+        self.outgoing = bytearray()
+        self.frames = 0
+        self.dropped = 0
+
+    def on_read(self) -> None:
+        try:
+            self.incoming += os.read(self.master, 4096)
+        except BlockingIOError:
+            return
+        while len(self.incoming) >= Cmd.SIZE:
+            cmd = int.from_bytes(self.incoming[:Cmd.SIZE], byteorder="little")
+            self.incoming = self.incoming[Cmd.SIZE:]
+            if cmd == Cmd.PC_HELLO:
+                self.outgoing.clear()
+                self.send(self.stream.config())
+                self.stream.begin()
+                if self.faults:
+                    self.faults.begin(self.stream.start)
+                self.streaming = True
+            elif cmd == Cmd.PC_BYE:
+                self.streaming = False
+
+    def on_write(self) -> None:
+        if self.outgoing:
+            try:
+                del self.outgoing[:os.write(self.master, self.outgoing)]
+            except BlockingIOError:
+                pass
+
+    def send(self, data: bytes) -> None:
+        if len(self.outgoing) > self.max_pending:
+            self.dropped += len(data) // self.stream.frame_size * self.stream.moments
+            return
+        self.outgoing += data
+        self.on_write()
+
+    def deadline(self) -> int:
+        if self.faults and self.faults.stall_end > self.stream.deadline():
+            return self.faults.stall_end
+        return self.stream.deadline()
+
+    def pump(self, now: int) -> None:
+        if not self.streaming or (self.faults and self.faults.stalled(now)):
+            return
+        data = self.stream.produce(now)
+        if data:
+            count = len(data) // self.stream.frame_size
+            if self.faults:
+                first = self.stream.sent // self.stream.moments - count
+                data = self.faults.apply(now, data, first, self.stream.frame_size,
+                                         self.stream.sized)
+            self.frames += count * self.stream.moments
+            self.send(data)
 
 def main() -> None:
     parser = argparse.ArgumentParser(
@@ -69,6 +544,16 @@ def main() -> None:
             "    labbox-generator -b 115200\n"
             "  two signals at 3 Hz and 4 Hz:\n"
             '    labbox-generator -b 115200 -s "sin;sqr" -f "3;4"\n'
+            "  10 kHz stream with timing statistics:\n"
+            "    labbox-generator -b 115200 -r 10000 --jitter-report\n"
+            "  5 kHz stream in blocks of 50 frames per DATA_START:\n"
+            "    labbox-generator -b 115200 -r 5000 -l 50\n"
+            "  numbered frames, 1 of 1000 corrupted:\n"
+            "    labbox-generator -b 115200 -r 1000 --sequence --corrupt 0.001\n"
+            "  a sine as 8-bit samples and a saw as differences at 57600 baud:\n"
+            '    labbox-generator -b 57600 -l 50 -s "sin;saw" -f "1;2" --format "int8;delta16"\n'
+            "  two devices, the second one with two signals at 1 kHz:\n"
+            '    labbox-generator -b 115200 -n 2 -s "sin,tri;saw" -f "1,2;3" -r "100,1000"\n'
         ),
         formatter_class=argparse.RawTextHelpFormatter,
     )
@@ -81,71 +566,257 @@ def main() -> None:
         type=int,
         dest="baudrate",
     )
+    parser.add_argument(
+        "-n",
+        "--devices",
+        help="Number of pseudo serial devices served at once",
+        type=int,
+        default=1,
+        dest="devices",
+    )
     parser.add_argument(
         "-f",
         "--frequency",
-        help="Frequencies for each signal, integers in [1, 10]. Use ';' to separate multiple values",
-        type=_parse_freqs,
+        help="Frequencies for each signal, integers in [1, 10]. Use ';' to separate multiple values\n"
+             "and ',' to give each device its own values",
+        type=_per_device(_parse_freqs),
         default="1",
         dest="frequency",
     )
     parser.add_argument(
         "-s",
         "--signal",
-        help="Signal types. Options: sin, sqr, tri, saw. Use ';' for multiple",
-        type=_parse_signals,
+        help="Signal types. Options: sin, sqr, tri, saw. Use ';' for multiple\n"
+             "and ',' to give each device its own signals",
+        type=_per_device(_parse_signals),
         default="sin",
         dest="signals",
     )
+    parser.add_argument(
+        "-r",
+        "--rate",
+        help="Frames per second, up to 50000. Use ',' to give each device its own rate",
+        type=_per_device(_parse_rate),
+        default="100",
+        dest="rate",
+    )
+    parser.add_argument(
+        "--jitter-report",
+        help="Report distribution of intervals between sent frames",
+        action="store_true",
+        dest="jitter_report",
+    )
+    parser.add_argument(
+        "-k",
+        "--block",
+        help="Number of frames synthesized and written at once",
+        type=int,
+        default=1,
+        dest="block",
+    )
+
+    parser.add_argument(
+        "--tick",
+        help="Announce Feature.TICK and put device clock in us into every frame",
+        action="store_true",
+        dest="tick",
+    )
+    parser.add_argument(
+        "--sequence",
+        help="Announce Feature.SEQUENCE and number every frame by its first moment, so the host\n"
+             "counts frames dropped on the way or by this device when not read in time",
+        action="store_true",
+        dest="sequence",
+    )
+    parser.add_argument(
+        "-l",
+        "--block-length",
+        help="Announce Feature.BLOCK and send BLOCK_LENGTH frames after every DATA_START,\n"
+             "0 sends a DATA_START before every frame",
+        type=int,
+        default=0,
+        dest="block_length",
+    )
+    parser.add_argument(
+        "--format",
+        help="Announce Feature.FORMAT and send every signal in its sample format. Options:\n"
+             "int8, int16, int32, float32, and delta8, delta16, delta32 for differences\n"
+             "between moments of a block as varints, which need --block-length.\n"
+             "A single format applies to every signal, use ';' for multiple\n"
+             "and ',' to give each device its own formats",
+        type=_per_device(_parse_formats),
+        default="int16",
+        dest="formats",
+    )
+    parser.add_argument(
+        "-c",
+        "--capture",
+        help="Serve bytes captured from a real device with 'labbox --capture'\n"
+             "instead of synthesized signals",
+        dest="capture",
+    )
+    parser.add_argument(
+        "--capture-speed",
+        help="Replay speed of the capture relative to original timing, 0 for no pauses",
+        type=float,
+        default=1.0,
+        dest="capture_speed",
+    )
+    faults = parser.add_argument_group("fault injection")
+    faults.add_argument(
+        "--drop",
+        help="Probability of dropping each sent byte",
+        type=float,
+        default=0.0,
+        dest="drop_prob",
+    )
+    faults.add_argument(
+        "--corrupt",
+        help="Probability of corrupting DATA_START header of each frame",
+        type=float,
+        default=0.0,
+        dest="corrupt_prob",
+    )
+    faults.add_argument(
+        "--burst",
+        help="Send frames back-to-back in bursts of BURST frames followed by silence",
+        type=int,
+        default=0,
+        dest="burst",
+    )
+    faults.add_argument(
+        "--stall-rate",
+        help="Average number of output stalls per second",
+        type=float,
+        default=0.0,
+        dest="stall_rate",
+    )
+    faults.add_argument(
+        "--stall-ms",
+        help="Duration of each output stall in ms, frames due meanwhile follow at once",
+        type=float,
+        default=100.0,
+        dest="stall_ms",
+    )
+    faults.add_argument(
+        "--seed",
+        help="Seed of the random fault generator, each device uses seed + its index",
+        type=int,
+        default=0,
+        dest="seed",
+    )
+    faults.add_argument(
+        "--fault-log",
+        help="Path to write injected faults to as JSON lines",
+        dest="fault_log",
+    )
 
     args = parser.parse_args()
-    signals = args.signals if isinstance(args.signals, list) else _parse_signals(args.signals)
-    freqs = args.frequency if isinstance(args.frequency, list) else _parse_freqs(args.frequency)
-    _validate_pairing(signals, freqs)
+    if args.devices < 1:
+        parser.error("Number of devices must be positive")
+    if not 0 <= args.block_length <= 0xFFFF:
+        parser.error("Block length must be in [0, 65535]")
+    try:
+        signals = _spread(args.signals, args.devices, "signal")
+        freqs = _spread(args.frequency, args.devices, "frequency")
+        rates = _spread(args.rate, args.devices, "rate")
+        formats = _spread(args.formats, args.devices, "format")
+        for i, (device_signals, device_freqs) in enumerate(zip(signals, freqs)):
+            _validate_pairing(device_signals, device_freqs)
+            if len(formats[i]) == 1:
+                formats[i] = formats[i] * len(device_signals)
+            elif len(formats[i]) != len(device_signals):
+                raise argparse.ArgumentTypeError(
+                    f"Got {len(device_signals)} signal(s) but {len(formats[i])} format(s)"
+                )
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    for device_formats in formats:
+        delta = [fmt for fmt in device_formats if fmt & Format.DELTA]
+        if delta and not args.block_length:
+            parser.error("Delta formats need --block-length")
+        # worst case varint of a difference takes a byte per 7 bits
+        size = sum(-(-(8 * np.dtype(t).itemsize + 2) // 7) for t in sample_types(0, delta))
+        if size * args.block_length > 0xFFFF:
+            parser.error("Delta encoded block may exceed 65535 bytes, reduce --block-length")
 
     logging.basicConfig(level=logging.INFO, format="%(asctime)s - [%(levelname)s] %(message)s")
 
-    inc_time = 0.01
     max_val = 3000
     min_val = -3000
 
-    master, slave = pty.openpty()
-    logging.info("Pseudo serial device: %s", os.ttyname(slave))
-    logging.info("Signals: %s  Frequencies: %s", signals, freqs)
+    fault_log = open(args.fault_log, "w", buffering=1) if args.fault_log else None
+    inject = args.drop_prob or args.corrupt_prob or args.burst or args.stall_rate
 
-    # handshake
-    while True:
-        cmd = int.from_bytes(os.read(master, 4), byteorder="little")
-        if cmd == Cmd.PC_HELLO:
-            arr = Cmd.CFG_START.to_bytes(4, byteorder="little")
-            arr += len(signals).to_bytes(1, byteorder="little")
-            arr += max_val.to_bytes(2, byteorder="little", signed=True)
-            arr += min_val.to_bytes(2, byteorder="little", signed=True)
-            arr += int(inc_time * 1000).to_bytes(1, byteorder="little")
-            for s in signals:
-                arr += len(s).to_bytes(1, byteorder="little")
-                for ch in s:
-                    arr += ord(ch).to_bytes(1, byteorder="little")
-            os.write(master, arr)
-            break
-
-    # stream
-    t = 0.0
+    devices = []
+    selector = selectors.DefaultSelector()
+    for i, (device_signals, device_freqs, rate, device_formats) in enumerate(
+            zip(signals, freqs, rates, formats)):
+        if args.capture:
+            stream = CaptureStream(args.capture, args.capture_speed)
+        else:
+            features = (Feature.TICK if args.tick else 0) | (Feature.BLOCK if args.block_length else 0)
+            if args.sequence:
+                features |= Feature.SEQUENCE
+            # devices sending only INT16 samples keep the plain config
+            if any(device_formats):
+                features |= Feature.FORMAT
+            else:
+                device_formats = None
+            stream = Stream(
+                device_signals, device_freqs, rate, max(args.block, args.burst), min_val, max_val,
+                args.jitter_report, features, args.block_length, device_formats,
+            )
+        device = Device(stream)
+        if inject:
+            device.faults = Faults(
+                args.seed + i, args.drop_prob, args.corrupt_prob, args.burst,
+                args.stall_rate, args.stall_ms, fault_log, device.path,
+            )
+        devices.append(device)
+        selector.register(device.master, selectors.EVENT_READ, device)
+        logging.info("Pseudo serial device: %s", device.path)
+        if args.capture:
+            logging.info("Capture: %s  Signals: %s", args.capture, stream.signals)
+        else:
+            logging.info("Signals: %s  Frequencies: %s  Rate: %g Hz", device_signals, device_freqs, rate)
+
+    sent = [0] * len(devices)
+    report = time.monotonic()
     while True:
-        arr = Cmd.DATA_START.to_bytes(4, byteorder="little")
-        for s, f in zip(signals, freqs):
-            f = int(f)
-            if s == "sin":
-                arr += sin_func(f, t, min_val, max_val)
-            elif s == "sqr":
-                arr += sqr_func(f, t, min_val, max_val)
-            elif s == "saw":
-                arr += saw_func(f, t, min_val, max_val)
-            elif s == "tri":
-                arr += tri_func(f, t, min_val, max_val)
-        t += inc_time
-        os.write(master, arr)
-        sleep(inc_time)
+        # wake up for the closest frame deadline, reports or host commands
+        timeout = 1.0
+        now = time.perf_counter_ns()
+        for device in devices:
+            if device.streaming:
+                timeout = min(timeout, max(device.deadline() - now, 0) / 1e9)
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if device.outgoing else 0)
+            if selector.get_key(device.master).events != events:
+                selector.modify(device.master, events, device)
+
+        for key, mask in selector.select(timeout):
+            if mask & selectors.EVENT_READ:
+                key.data.on_read()
+            if mask & selectors.EVENT_WRITE:
+                key.data.on_write()
+
+        now = time.perf_counter_ns()
+        for device in devices:
+            device.pump(now)
+
+        now = time.monotonic()
+        if now - report >= 5:
+            for i, device in enumerate(devices):
+                if not device.streaming:
+                    continue
+                logging.info("%s: %.0f frames/s  dropped: %d", device.path,
+                             (device.frames - sent[i]) / (now - report), device.dropped)
+                if device.faults:
+                    logging.info("%s: injected %s", device.path, device.faults.counts)
+                if device.stream.jitter is not None:
+                    logging.info("%s: %s", device.path, device.stream.jitter_report())
+                sent[i] = device.frames
+            report = now
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,91 @@
+import json
+import time
+
+# monotonically growing counters, reports carry their rate of change
+COUNTERS = ("frames", "bytes", "reads", "decode_ns", "renders", "render_ns")
+
+
+class Metrics:
+    """
+    Instrumentation counters of the acquisition and render path. The reader
+    thread and the GUI thread only add to them, report() turns them into
+    per-interval rates and averages and optionally appends the result as a
+    JSON line to a file for long-run monitoring.
+    """
+
+    def __init__(self, path: str = None):
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        # largest in_waiting seen since previous report
+        self.backlog = 0
+        self._previous = dict.fromkeys(COUNTERS, 0)
+        self._last = time.monotonic()
+        self.file = open(path, "a") if path else None
+
+    def observe_backlog(self, waiting: int) -> None:
+        if waiting > self.backlog:
+            self.backlog = waiting
+
+    def due(self, interval: float) -> bool:
+        return time.monotonic() - self._last >= interval
+
+    def report(self, **gauges) -> dict:
+        """
+        Rates since previous report merged with current values of the gauges
+        :param gauges: point in time values, e.g. resyncs or queue depth
+        :return:
+        """
+        now = time.monotonic()
+        elapsed = max(now - self._last, 1e-9)
+        delta = {name: getattr(self, name) - self._previous[name] for name in COUNTERS}
+        report = {
+            "time": time.time(),
+            "frames_per_s": delta["frames"] / elapsed,
+            "bytes_per_s": delta["bytes"] / elapsed,
+            "fps": delta["renders"] / elapsed,
+            "backlog": self.backlog,
+            "decode_ms": delta["decode_ns"] / max(delta["reads"], 1) / 1e6,
+            "render_ms": delta["render_ns"] / max(delta["renders"], 1) / 1e6,
+            "frames": self.frames,
+        }
+        report.update(gauges)
+        self._previous = {name: getattr(self, name) for name in COUNTERS}
+        self._last = now
+        self.backlog = 0
+        if self.file:
+            self.file.write(json.dumps(report) + "\n")
+            self.file.flush()
+        return report
+
+    def close(self) -> None:
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+def format_report(report: dict, render: bool = True) -> str:
+    """
+    One line summary of a report for status bars and logs
+    """
+    parts = []
+    if render:
+        parts.append("{:.1f} fps".format(report["fps"]))
+    parts += [
+        "{:.0f} frames/s".format(report["frames_per_s"]),
+        "{:.1f} KiB/s".format(report["bytes_per_s"] / 1024),
+        "backlog: {} B".format(report["backlog"]),
+        "decode: {:.2f} ms".format(report["decode_ms"]),
+    ]
+    if render:
+        parts.append("render: {:.1f} ms".format(report["render_ms"]))
+    if "resyncs" in report:
+        parts.append("resyncs: {}  dropped: {}".format(report["resyncs"], report["dropped"]))
+    if report.get("overflow"):
+        parts.append("overflow: {}".format(report["overflow"]))
+    if report.get("lost"):
+        parts.append("lost: {} ({:.3%})".format(report["lost"], report["loss"]))
+    if "queue" in report:
+        parts.append("queue: {}".format(report["queue"]))
+    if report.get("log_dropped"):
+        parts.append("log dropped: {}".format(report["log_dropped"]))
+    return "  ".join(parts)
@@ -0,0 +1,831 @@
+#!/usr/bin/env python3
+import argparse
+import io
+import time
+
+import numpy as np
+
+from labbox.defines import Cmd, CfgData, Feature, Format
+
+DATA_MARKER = Cmd.DATA_START.to_bytes(Cmd.SIZE, byteorder="little")
+_TICK_MASK = (1 << 32) - 1
+_SEQUENCE_MASK = (1 << 32) - 1
+SAMPLE_TYPES = {
+    Format.INT8: "<i1",
+    Format.INT16: "<i2",
+    Format.INT32: "<i4",
+    Format.FLOAT32: "<f4",
+}
+
+
+def sample_types(graph_numbers: int, formats: list = None) -> list:
+    """
+    :return: wire type of every signal, all INT16 if no formats announced
+    """
+    if not formats:
+        return [SAMPLE_TYPES[Format.INT16]] * graph_numbers
+    return [SAMPLE_TYPES[fmt & Format.TYPE] for fmt in formats]
+
+
+def sample_dtype(formats: list = None) -> np.dtype:
+    """
+    :return: smallest type decoded samples of every announced format fit in,
+        int16 at least
+    """
+    return np.result_type(np.int16, *sample_types(0, formats))
+
+
+def frame_dtype(graph_numbers: int, features: int = 0, block_length: int = 0,
+                formats: list = None) -> np.dtype:
+    """
+    Layout of a single data frame: DATA_START header, device tick counter
+    if Feature.TICK is announced, then samples. With Feature.BLOCK the tick
+    is of the last sample and the samples of block_length moments follow
+    their count. A sequence number of the first moment, if Feature.SEQUENCE
+    is announced, ends the header. Samples of signals in different formats
+    are "s<index>" fields of every moment, delta encoded signals are left
+    out, their varint differences follow the frame and are counted by "size".
+    """
+    types = sample_types(graph_numbers, formats)
+    fixed = [i for i, fmt in enumerate(formats or [Format.INT16] * graph_numbers)
+             if not fmt & Format.DELTA]
+    fields = [("header", "<u4")]
+    if features & Feature.TICK:
+        fields.append(("tick", "<u4"))
+    shape = ()
+    if features & Feature.BLOCK:
+        fields.append(("count", "<u2"))
+        shape = (block_length,)
+    if len(fixed) < graph_numbers:
+        fields.append(("size", "<u2"))
+    if features & Feature.SEQUENCE:
+        fields.append(("sequence", "<u4"))
+    if len({types[i] for i in fixed}) > 1:
+        fields.append(("samples", [("s%d" % i, types[i]) for i in fixed], shape))
+    else:
+        fields.append(("samples", types[fixed[0]] if fixed else "<i2", shape + (len(fixed),)))
+    return np.dtype(fields)
+
+
+def _read(port, size: int, deadline: float = None, cancelled=None) -> bytes:
+    """
+    Reads exactly size bytes, retrying short reads until the deadline
+    :param deadline: time.monotonic moment, single read if None
+    :param cancelled: polled between reads, aborts when returns True
+    """
+    data = port.read(size=size)
+    while len(data) < size and deadline is not None and time.monotonic() < deadline:
+        if cancelled is not None and cancelled():
+            raise InterruptedError("Connection cancelled.")
+        data += port.read(size=size - len(data))
+    if len(data) != size:
+        raise RuntimeError("Timeout elapsed!")
+    return data
+
+
+def _read_int(port, size: int = 1, signed: bool = False, deadline: float = None,
+              cancelled=None) -> int:
+    return int.from_bytes(_read(port, size, deadline, cancelled), signed=signed,
+                          byteorder="little")
+
+
+def handshake(port, timeout: float = None, attempts: int = 1,
+              progress=None, cancelled=None) -> CfgData:
+    """
+    Sends PC_HELLO and reads the CFG_START block announced by the device.
+    PC_HELLO is repeated when the device keeps silent or answers with stale
+    data, attempts share the overall timeout equally.
+    :param port: opened port, serial.Serial or alike
+    :param timeout: overall deadline in seconds, every field gets a single
+        port read if None
+    :param attempts: number of PC_HELLO sent at most
+    :param progress: called with attempt number before every PC_HELLO
+    :param cancelled: polled while waiting, aborts with InterruptedError
+        when returns True
+    :return: parsed config
+    """
+    started = time.monotonic()
+    deadline = started + timeout if timeout is not None else None
+    for attempt in range(1, attempts + 1):
+        if progress is not None:
+            progress(attempt)
+        port.write(Cmd.PC_HELLO.to_bytes(Cmd.SIZE, byteorder="little"))
+        if deadline is not None:
+            window = started + timeout * attempt / attempts
+        else:
+            window = None
+        try:
+            start = int.from_bytes(_read(port, Cmd.SIZE, window, cancelled), byteorder="little")
+        except RuntimeError:
+            if attempt == attempts:
+                raise RuntimeError(
+                    "Timeout elapsed!\nNo answer from micro to {} PC_HELLO.".format(attempts)
+                )
+            continue
+        if start & ~Feature.MASK == Cmd.CFG_START:
+            break
+        if attempt == attempts:
+            raise ValueError("No config start byte from micro was detected.")
+        # frames of a previous session are still arriving, drop them
+        port.read(size=port.in_waiting)
+
+    cfg_data = CfgData()
+    cfg_data.features = start & Feature.MASK
+    cfg_data.graphNumbers = _read_int(port, deadline=deadline, cancelled=cancelled)
+    cfg_data.maxVoltage = _read_int(port, size=2, signed=True, deadline=deadline,
+                                    cancelled=cancelled) * 1.1
+    cfg_data.minVoltage = _read_int(port, size=2, signed=True, deadline=deadline,
+                                    cancelled=cancelled) * 1.1
+    cfg_data.updateTime = _read_int(port, deadline=deadline, cancelled=cancelled)
+    for _ in range(cfg_data.graphNumbers):
+        length = _read_int(port, deadline=deadline, cancelled=cancelled)
+        cfg_data.namesList.append(_read(port, length, deadline, cancelled).decode("utf-8"))
+    # fields of announced features follow the names in order of their bits
+    if cfg_data.features & Feature.BLOCK:
+        cfg_data.blockLength = _read_int(port, size=2, deadline=deadline, cancelled=cancelled)
+        if not cfg_data.blockLength:
+            raise ValueError("Block mode announced with zero block length.")
+    if cfg_data.features & Feature.FORMAT:
+        cfg_data.formats = list(_read(port, cfg_data.graphNumbers, deadline, cancelled))
+        for fmt in cfg_data.formats:
+            if fmt & Format.TYPE not in SAMPLE_TYPES or fmt & ~(Format.TYPE | Format.DELTA):
+                raise ValueError("Unknown sample format 0x{:02X}.".format(fmt))
+            if fmt & Format.DELTA and (fmt & Format.TYPE == Format.FLOAT32
+                                       or not cfg_data.features & Feature.BLOCK):
+                raise ValueError("Delta encoding needs block mode and integer samples.")
+    return cfg_data
+
+
+class FrameParser:
+    """
+    Streaming parser of DATA_START frames. Keeps unparsed bytes in a
+    preallocated receive buffer and resynchronizes on the next DATA_START
+    marker whenever bytes were lost or corrupted. A frame is accepted only
+    once the marker of the following frame is received.
+
+    In block mode every DATA_START carries several moments. Frames of the
+    full block_length are checked at once as fixed size records, shorter
+    ones, e.g. flushed by the device before a pause, one by one. Decoded
+    frames are moments, a block may be handed out over several calls.
+
+    Samples of every announced format are widened to sample_dtype. Blocks
+    with delta encoded signals differ in size, so they are all checked one
+    by one, and runs of full ones are decoded at once.
+
+    With Feature.SEQUENCE every moment handed out comes with the number of
+    moments lost right before it, told by gaps in sequence numbers of a
+    whole batch of frames at once. Lost frames are counted exactly then,
+    bytes lost inside a frame as well as frames the device never sent.
+    """
+    # full delta encoded blocks decoded at once, bounds their temporaries
+    sized_batch = 64
+
+    def __init__(self, graph_numbers: int, capacity: int = 1 << 16, features: int = 0,
+                 block_length: int = 0, update_time: int = 1, formats: list = None):
+        """
+        :param block_length: max moments per DATA_START if Feature.BLOCK
+        :param update_time: announced interval between moments in ms, spaces
+            ticks of the very first block
+        :param formats: Format of every signal if Feature.FORMAT
+        """
+        self.graph_numbers = graph_numbers
+        self.features = features
+        self.block_length = block_length if features & Feature.BLOCK else 1
+        self.formats = formats if features & Feature.FORMAT else None
+        self.sample_dtype = sample_dtype(self.formats)
+        self.dtype = frame_dtype(graph_numbers, features, block_length, self.formats)
+        formats = self.formats or [Format.INT16] * graph_numbers
+        # signals sent as fixed size samples and as varint differences
+        self._fixed = [i for i, fmt in enumerate(formats) if not fmt & Format.DELTA]
+        self._delta = [i for i, fmt in enumerate(formats) if fmt & Format.DELTA]
+        # samples of a single format are handed out straight from the buffer
+        self._direct = not self._delta and self.dtype["samples"].base.names is None
+        # device ticks of the frames returned by the latest feed, if announced
+        self.ticks = np.empty(0, dtype="<u4") if features & Feature.TICK else None
+        # moments lost before every frame returned by the latest feed, if announced
+        self.gaps = np.empty(0, dtype="<u4") if features & Feature.SEQUENCE else None
+        # sequence number the next moment handed out should have
+        self._sequence = None
+        if self.gaps is not None:
+            self._sequence_at = self.dtype.fields["sequence"][1]
+        self._buffer = bytearray(max(capacity, 2 * self.dtype.itemsize))
+        self._view = memoryview(self._buffer)
+        # the latest read timed out, so the last frame has nothing to wait for
+        self._idle = False
+        if features & Feature.BLOCK:
+            # layouts of blocks shorter than block_length by their count
+            self._blocks = {}
+            head = frame_dtype(graph_numbers, features, 0, self.formats)
+            self._head = head.itemsize
+            self._count_at = head.fields["count"][1]
+            if self._delta:
+                self._size_at = head.fields["size"][1]
+                # worst case varint of a difference takes a byte per 7 bits,
+                # larger sizes are corrupted
+                self._most = sum(-(-(8 * np.dtype(t).itemsize + 2) // 7)
+                                 for t in sample_types(0, [formats[i] for i in self._delta]))
+            self._steps = np.arange(1, self.block_length + 1, dtype=np.int64)
+            self._period = update_time * 1000
+            # tick of the last moment of the previous block
+            self._tick_last = None
+        # moments of the block at the buffer start already handed out
+        self._offset = 0
+        self._scratch()
+        self._length = 0
+        # bytes of delta encoded frames handed out
+        self._taken = 0
+        self.frames = 0
+        self.discarded = 0
+        self.resyncs = 0
+        # moments lost by sequence numbers
+        self.lost = 0
+
+    @property
+    def pending(self) -> int:
+        return self._length
+
+    @property
+    def dropped(self) -> int:
+        """
+        Frames lost to resynchronization, estimated from discarded bytes,
+        see lost for the exact count if Feature.SEQUENCE is announced
+        """
+        if self._delta and self._taken:
+            # frames differ in size, so by the average one
+            return -(-self.discarded * self.frames // self._taken)
+        return -(-self.discarded * self.block_length // self.dtype.itemsize)
+
+    def _reserve(self, size: int) -> None:
+        if self._length + size > len(self._buffer):
+            grown = bytearray(max(2 * len(self._buffer), self._length + size))
+            grown[:self._length] = self._buffer[:self._length]
+            self._buffer = grown
+            self._view = memoryview(grown)
+            self._scratch()
+
+    def _scratch(self) -> None:
+        # header checks of every frame the buffer can hold, reused by _scan
+        frames = len(self._buffer) // self.dtype.itemsize + 1
+        self._marked = np.empty(frames, dtype=bool)
+        self._valid = np.empty(frames, dtype=bool)
+        if not self._direct:
+            self._decoded = np.empty((frames * self.block_length, self.graph_numbers),
+                                     dtype=self.sample_dtype)
+        if self.features & Feature.BLOCK and self.features & Feature.TICK:
+            # ticks of blocks preceded by the previous one and of their moments
+            self._block_ticks = np.empty(frames + 1, dtype=np.int64)
+            self._spans = np.empty(frames, dtype=np.int64)
+            self._moment_ticks = np.empty(frames * self.block_length, dtype=np.int64)
+        if self.gaps is not None:
+            # gaps are only ever written at the first moment of a frame
+            self._jumps = np.empty(frames, dtype=np.int64)
+            self._moment_gaps = np.zeros(frames * self.block_length, dtype=np.int64)
+
+    def feed(self, data) -> np.ndarray:
+        """
+        Appends received bytes and parses all complete frames
+        :param data: bytes-like object
+        :return: (frames, graph_numbers) array of samples
+        """
+        size = len(data)
+        self._reserve(size)
+        self._view[self._length:self._length + size] = data
+        self._length += size
+        self._idle = False
+        return self.parse()
+
+    def receive(self, port, size: int) -> int:
+        """
+        Reads up to size bytes from the port straight into the receive
+        buffer, without intermediate bytes objects. If nothing was received
+        until the port timeout, the last frame is parsed without waiting for
+        the marker of the next one.
+        :param port: transport with readinto
+        :return: number of bytes received
+        """
+        self._reserve(size)
+        received = port.readinto(self._view[self._length:self._length + size])
+        self._length += received
+        self._idle = not received
+        return received
+
+    def parse(self) -> np.ndarray:
+        """
+        Parses all complete frames received so far
+        :return: (frames, graph_numbers) array of samples
+        """
+        blocks = []
+        ticks = []
+        gaps = []
+
+        def take(samples, moments, lost):
+            samples = np.array(samples, dtype=self.sample_dtype)
+            blocks.append(samples.reshape(-1, self.graph_numbers))
+            if moments is not None:
+                ticks.append(np.array(moments, dtype="<u4").reshape(-1))
+            if lost is not None:
+                gaps.append(np.array(lost, dtype="<u4").reshape(-1))
+            return len(blocks[-1])
+
+        self._parse(take)
+        if self.ticks is not None:
+            self.ticks = np.concatenate(ticks) if ticks else np.empty(0, dtype="<u4")
+        if self.gaps is not None:
+            self.gaps = np.concatenate(gaps) if gaps else np.empty(0, dtype="<u4")
+        if not blocks:
+            return np.empty((0, self.graph_numbers), dtype=self.sample_dtype)
+        return blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+
+    def parse_into(self, samples: np.ndarray, ticks: np.ndarray = None,
+                   gaps: np.ndarray = None) -> int:
+        """
+        Decodes complete frames straight into preallocated arrays, frames
+        that don't fit are kept for the next call
+        :param samples: (frames, graph_numbers) array to fill from the start
+        :param ticks: (frames,) array for device ticks, if announced
+        :param gaps: (frames,) array for moments lost before every frame,
+            if sequence numbers are announced
+        :return: number of decoded frames
+        """
+        count = 0
+
+        def take(blocks, moments, lost):
+            nonlocal count
+            number, length = blocks.shape[:2]
+            whole = min(number, (len(samples) - count) // length)
+            end = count + whole * length
+            samples[count:end].reshape(whole, length, self.graph_numbers)[...] = blocks[:whole]
+            if ticks is not None:
+                ticks[count:end].reshape(whole, length)[...] = moments[:whole]
+            if gaps is not None:
+                gaps[count:end].reshape(whole, length)[...] = lost[:whole]
+            # output ends inside a block, the rest of it is handed out later
+            part = min(len(samples) - end, length) if whole < number else 0
+            if part:
+                samples[end:end + part] = blocks[whole, :part]
+                if ticks is not None:
+                    ticks[end:end + part] = moments[whole, :part]
+                if gaps is not None:
+                    gaps[end:end + part] = lost[whole, :part]
+            count = end + part
+            return whole * length + part
+
+        self._parse(take)
+        return count
+
+    def _parse(self, take) -> None:
+        if self.features & Feature.BLOCK:
+            self._scan_blocks(take)
+        else:
+            self._scan(take)
+
+    def _scan(self, take) -> None:
+        """
+        Finds valid frames in the receive buffer and passes views of their
+        samples, ticks and gaps as (frames, 1, ...) arrays to take, which
+        returns how many of them it consumed
+        """
+        buf = self._buffer
+        length = self._length
+        itemsize = self.dtype.itemsize
+        pos = 0
+        skip = 0
+        while True:
+            start = buf.find(DATA_MARKER, pos + skip, length)
+            if start < 0:
+                pos = self._discard_tail(pos, length)
+                break
+            if start != pos:
+                self.discarded += start - pos
+                self.resyncs += 1
+                pos = start
+            skip = 0
+            count = (length - pos) // itemsize
+            if not count:
+                break
+            frames = np.frombuffer(buf, dtype=self.dtype, count=count, offset=pos)
+            marked = np.equal(frames["header"], Cmd.DATA_START, out=self._marked[:count])
+            valid = self._valid[:count]
+            # frame is trusted only if the next one starts with a marker too,
+            # otherwise it has swallowed bytes of its neighbour
+            np.logical_and(marked[:-1], marked[1:], out=valid[:-1])
+            valid[-1] = marked[-1]
+            end = pos + count * itemsize
+            following = buf[end:min(end + Cmd.SIZE, length)]
+            # last frame waits until the following marker is received,
+            # unless nothing more came
+            waiting = len(following) < Cmd.SIZE and DATA_MARKER.startswith(following)
+            if not (self._idle and end == length):
+                valid[-1] &= not waiting and following == DATA_MARKER
+            good = count if valid.all() else int(np.argmin(valid))
+            if good:
+                frames = frames[:good]
+                gaps = None
+                if self.gaps is not None:
+                    gaps = self._gaps(frames, 1, pos + good * itemsize)
+                    frames = frames[:len(gaps)]
+                taken = take(
+                    self._samples(frames["samples"][:, np.newaxis]),
+                    frames["tick"][:, np.newaxis] if self.ticks is not None else None,
+                    gaps,
+                )
+                self.frames += taken
+                if gaps is not None and taken:
+                    self.lost += int(self._jumps[:taken].sum())
+                    self._sequence = int(frames["sequence"][taken - 1]) + 1
+                pos += taken * itemsize
+                if taken < good:
+                    break
+            if good < count:
+                if waiting and good == count - 1:
+                    break
+                skip = 1
+        self._compact(pos, length)
+
+    def _scan_blocks(self, take) -> None:
+        """
+        Block mode counterpart of _scan, passes (blocks, moments, ...) views
+        """
+        buf = self._buffer
+        length = self._length
+        itemsize = self.dtype.itemsize
+        head = self._head
+        pos = 0
+        skip = 0
+        while True:
+            start = buf.find(DATA_MARKER, pos + skip, length)
+            if start < 0:
+                pos = self._discard_tail(pos, length)
+                break
+            if start != pos:
+                self.discarded += start - pos
+                self.resyncs += 1
+                self._offset = 0
+                pos = start
+            skip = 0
+            count = (length - pos) // itemsize
+            good = 0
+            if count and not self._delta:
+                frames = np.frombuffer(buf, dtype=self.dtype, count=count, offset=pos)
+                marked = np.equal(frames["header"], Cmd.DATA_START, out=self._marked[:count])
+                valid = np.equal(frames["count"], self.block_length, out=self._valid[:count])
+                valid &= marked
+                valid[:-1] &= marked[1:]
+                end = pos + count * itemsize
+                valid[-1] &= buf[end:min(end + Cmd.SIZE, length)] == DATA_MARKER \
+                    or self._idle and end == length
+                good = count if valid.all() else int(np.argmin(valid))
+            if good:
+                frames = frames[:good]
+                done = self._take_blocks(take, frames, self._samples(frames["samples"]),
+                                         pos + good * itemsize)
+                pos += done * itemsize
+                if done < good:
+                    break
+                continue
+            if self._delta:
+                taken, complete = self._take_sized(take, pos, length)
+                if taken != pos:
+                    pos = taken
+                    if not complete:
+                        break
+                    continue
+            # shorter or not yet trusted block at pos
+            if length - pos < head:
+                break
+            size = int.from_bytes(buf[pos + self._count_at:pos + self._count_at + 2],
+                                  byteorder="little")
+            if not 0 < size <= self.block_length:
+                skip = 1
+                continue
+            if size not in self._blocks:
+                self._blocks[size] = frame_dtype(self.graph_numbers, self.features, size,
+                                                 self.formats)
+            fixed = self._blocks[size].itemsize
+            end = pos + fixed
+            if self._delta:
+                payload = int.from_bytes(buf[pos + self._size_at:pos + self._size_at + 2],
+                                         byteorder="little")
+                if payload > size * self._most:
+                    skip = 1
+                    continue
+                end += payload
+            following = buf[end:min(end + Cmd.SIZE, length)]
+            if following != DATA_MARKER and not (self._idle and end == length):
+                if len(following) < Cmd.SIZE and DATA_MARKER.startswith(following):
+                    break
+                skip = 1
+                continue
+            block = np.frombuffer(buf, dtype=self._blocks[size], count=1, offset=pos)
+            samples = self._samples(block["samples"])
+            if self._delta and not self._expand(
+                    np.frombuffer(buf, dtype=np.uint8, count=end - pos - fixed, offset=pos + fixed),
+                    samples, np.array([end - pos - fixed])):
+                skip = 1
+                continue
+            if not self._take_blocks(take, block, samples, end):
+                break
+            self._taken += end - pos
+            pos = end
+        self._compact(pos, length)
+
+    def _take_sized(self, take, pos: int, length: int) -> tuple:
+        """
+        Delta encoded frames differ in size, so full blocks from pos on are
+        found one by one, then gathered and decoded at once
+        :return: position after the blocks handed out and whether all of
+            the decoded ones were
+        """
+        buf = self._buffer
+        head = self._head
+        itemsize = self.dtype.itemsize
+        # every difference takes a byte at least
+        least = self.block_length * len(self._delta)
+        most = self.block_length * self._most
+        starts = []
+        sizes = []
+        end = pos
+        while len(starts) < self.sized_batch and length - end >= head \
+                and buf.startswith(DATA_MARKER, end):
+            count = int.from_bytes(buf[end + self._count_at:end + self._count_at + 2],
+                                   byteorder="little")
+            size = int.from_bytes(buf[end + self._size_at:end + self._size_at + 2],
+                                  byteorder="little")
+            following = end + itemsize + size
+            if count != self.block_length or not least <= size <= most:
+                break
+            if following + Cmd.SIZE > length or not buf.startswith(DATA_MARKER, following):
+                if not (self._idle and following == length):
+                    break
+            starts.append(end)
+            sizes.append(size)
+            end = following
+        if not starts:
+            return pos, True
+        raw = np.frombuffer(buf, dtype=np.uint8, count=length)
+        starts = np.array(starts)
+        sizes = np.array(sizes)
+        blocks = raw[starts[:, np.newaxis] + np.arange(itemsize)].view(self.dtype)[:, 0]
+        # payloads of all blocks back to back
+        offsets = np.repeat(starts + itemsize - np.cumsum(sizes) + sizes, sizes)
+        payload = raw[offsets + np.arange(len(offsets))]
+        samples = self._samples(blocks["samples"])
+        good = self._expand(payload, samples, sizes)
+        if not good:
+            return pos, True
+        done = self._take_blocks(take, blocks[:good], samples[:good],
+                                 int(starts[good]) if good < len(starts) else end)
+        taken = int(starts[done]) if done < len(starts) else end
+        self._taken += taken - pos
+        return taken, done == good
+
+    def _take_blocks(self, take, blocks: np.ndarray, samples: np.ndarray, end: int) -> int:
+        """
+        Hands moments of equally long blocks to take, starting inside the
+        first one if it was cut by the previous call
+        :param samples: (blocks, moments, graph_numbers) decoded samples
+        :param end: position of the frame following the blocks in the buffer
+        :return: number of blocks handed out completely
+        """
+        size = samples.shape[1]
+        moments = self._moments(blocks, size) if self.ticks is not None else None
+        gaps = None
+        if self.gaps is not None:
+            gaps = self._gaps(blocks, size, end)
+            if not len(gaps):
+                return 0
+            blocks = blocks[:len(gaps)]
+            samples = samples[:len(gaps)]
+        done = 0
+        offset = self._offset
+        if offset:
+            taken = take(samples[:1, offset:],
+                         moments[:1, offset:] if moments is not None else None,
+                         gaps[:1, offset:] if gaps is not None else None)
+            self.frames += taken
+            if offset + taken < size:
+                self._offset += taken
+                self._follow(blocks, 0, size)
+                return 0
+            self._offset = 0
+            done = 1
+        if done < len(blocks):
+            taken = take(samples[done:], moments[done:] if moments is not None else None,
+                         gaps[done:] if gaps is not None else None)
+            self.frames += taken
+            if gaps is not None:
+                # gap of a block is handed out with its first moment
+                self.lost += int(self._jumps[done:done - (-taken // size)].sum())
+            done += taken // size
+            self._offset = taken % size
+        if done and self.ticks is not None:
+            self._tick_last = int(blocks["tick"][done - 1])
+        self._follow(blocks, done, size)
+        return done
+
+    def _follow(self, blocks: np.ndarray, done: int, size: int) -> None:
+        """
+        Expects the sequence number following the moments handed out, the
+        moments of a cut block are counted too, so the rest of it counts
+        as lost if it's discarded
+        """
+        if self.gaps is None:
+            return
+        if self._offset:
+            self._sequence = int(blocks["sequence"][done]) + self._offset
+        elif done:
+            self._sequence = int(blocks["sequence"][done - 1]) + size
+
+    def _moments(self, blocks: np.ndarray, size: int) -> np.ndarray:
+        """
+        Device ticks of every moment, spread evenly since the last moment
+        of the previous block, computed in place
+        :return: (blocks, moments) int64 view
+        """
+        number = len(blocks)
+        ticks = self._block_ticks[:number + 1]
+        ticks[1:] = blocks["tick"]
+        if self._tick_last is None:
+            ticks[0] = ticks[1] - size * self._period
+        else:
+            ticks[0] = self._tick_last
+        spans = self._spans[:number]
+        np.subtract(ticks[1:], ticks[:-1], out=spans)
+        spans &= _TICK_MASK
+        moments = self._moment_ticks[:number * size].reshape(number, size)
+        np.multiply(spans[:, np.newaxis], self._steps[:size], out=moments)
+        moments //= size
+        moments += ticks[:-1, np.newaxis]
+        moments &= _TICK_MASK
+        return moments
+
+    def _gaps(self, frames: np.ndarray, size: int, end: int) -> np.ndarray:
+        """
+        Moments lost before every frame, the difference of its sequence
+        number to the one following the previous frame, computed in place.
+        Signed differences are kept in _jumps for counting. A gap counts
+        only once the next frame continues the number after it, so the last
+        frame of a gap waits for the next one like it waits for its marker.
+        Numbers never go back, so a step back next to a gap tells a corrupted
+        number, it's replaced by the expected one. A step back alone takes
+        back what a number before it claimed.
+        :param size: moments of every frame
+        :param end: position of the frame following them in the buffer
+        :return: (frames, moments) int64 view, zero but at the first moment,
+            one frame short if the last one waits
+        """
+        number = len(frames)
+        sequence = frames["sequence"]
+        jumps = self._jumps[:number]
+        if self._sequence is None:
+            jumps[0] = sequence[0]
+        else:
+            # a cut block resumed at _offset is expected to continue itself
+            jumps[0] = self._sequence - self._offset
+        np.add(sequence[:-1], size, out=jumps[1:])
+        np.subtract(sequence, jumps, out=jumps)
+        jumps &= _SEQUENCE_MASK
+        half = (_SEQUENCE_MASK + 1) >> 1
+        # gaps are rare, so are checked one by one
+        for i in np.flatnonzero(jumps).tolist():
+            jump = int(jumps[i])
+            if i + 1 < number:
+                following = int(jumps[i + 1])
+            else:
+                following = self._following(end)
+                if following is None:
+                    number -= 1
+                    break
+                following = (following - int(sequence[i]) - size) & _SEQUENCE_MASK
+            if following and (jump >= half or following >= half):
+                sequence[i] = (int(sequence[i]) - jump) & _SEQUENCE_MASK
+                jumps[i] = 0
+                if i + 1 < number:
+                    jumps[i + 1] = (following + jump) & _SEQUENCE_MASK
+            elif jump >= half:
+                jumps[i] = jump - 2 * half
+        gaps = self._moment_gaps[:number * size].reshape(number, size)
+        np.maximum(jumps[:number], 0, out=gaps[:, 0])
+        return gaps
+
+    def _following(self, end: int):
+        """
+        :return: sequence number of the frame at end, None if not received yet
+        """
+        at = end + self._sequence_at
+        if at + 4 > self._length:
+            return None
+        return int.from_bytes(self._buffer[at:at + 4], byteorder="little")
+
+    def _samples(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Fixed size samples of (frames, moments) records as they are, or
+        widened into the decoded scratch if signals differ in format
+        :return: (frames, moments, graph_numbers) array
+        """
+        if self._direct:
+            return samples
+        number, size = samples.shape[:2]
+        out = self._decoded[:number * size].reshape(number, size, self.graph_numbers)
+        if samples.dtype.names:
+            for name in samples.dtype.names:
+                out[..., int(name[1:])] = samples[name]
+        elif self._fixed:
+            out[..., self._fixed] = samples
+        return out
+
+    def _expand(self, payload: np.ndarray, out: np.ndarray, sizes: np.ndarray) -> int:
+        """
+        Decodes zigzag varint differences of delta encoded signals, sent
+        signal by signal, into their columns
+        :param payload: differences of all blocks back to back
+        :param out: (blocks, moments, graph_numbers) samples of the blocks
+        :param sizes: (blocks,) bytes of differences of every block
+        :return: number of leading blocks holding a difference of every sample
+        """
+        if not len(payload):
+            return 0
+        last = payload < 0x80
+        count = out.shape[1] * len(self._delta)
+        ends = np.cumsum(sizes)
+        counts = np.diff(np.cumsum(last)[np.maximum(ends - 1, 0)], prepend=0)
+        valid = (counts == count) & last[np.maximum(ends - 1, 0)] & (sizes > 0)
+        good = len(valid) if valid.all() else int(np.argmin(valid))
+        if not good:
+            return 0
+        last = last[:ends[good - 1]]
+        data = payload[:ends[good - 1]]
+        # position of every byte in its varint, 7 bits per byte
+        starts = np.flatnonzero(np.concatenate(([True], last[:-1])))
+        shifts = np.arange(len(data)) - starts[np.cumsum(last) - last]
+        if shifts.max() > 9:
+            return 0
+        values = np.bitwise_or.reduceat(
+            (data & 0x7F).astype(np.uint64) << (7 * shifts).astype(np.uint64), starts
+        )
+        diffs = (values >> 1).astype(np.int64) ^ -(values & 1).astype(np.int64)
+        diffs = diffs.reshape(good, len(self._delta), -1)
+        out[:good, :, self._delta] = np.cumsum(diffs, axis=2).transpose(0, 2, 1)
+        return good
+
+    def _discard_tail(self, pos: int, length: int) -> int:
+        # keep a possible partial marker at the tail
+        keep = max(min(length - pos, Cmd.SIZE - 1), 0)
+        self.discarded += length - keep - pos
+        return length - keep
+
+    def _compact(self, pos: int, length: int) -> None:
+        rest = length - pos
+        self._view[:rest] = self._view[pos:length]
+        self._length = rest
+
+
+def _synthesize(graph_numbers: int, size: int, drop_rate: float, seed: int) -> bytes:
+    dtype = frame_dtype(graph_numbers)
+    rng = np.random.default_rng(seed)
+    frames = np.empty(size // dtype.itemsize, dtype=dtype)
+    frames["header"] = Cmd.DATA_START
+    frames["samples"] = rng.integers(-3000, 3000, frames["samples"].shape)
+    raw = np.frombuffer(frames.tobytes(), dtype=np.uint8)
+    return raw[rng.random(raw.size) >= drop_rate].tobytes()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark of the DATA_START frame parser on a raw byte capture.",
+    )
+    parser.add_argument("capture", nargs="?", help="Raw capture, synthesized if omitted")
+    parser.add_argument("-n", "--graphs", type=int, default=4, dest="graphs",
+                        help="Number of signals in a frame")
+    parser.add_argument("-m", "--megabytes", type=int, default=16, dest="megabytes",
+                        help="Size of synthesized capture")
+    parser.add_argument("-d", "--drop-rate", type=float, default=1e-4, dest="drop_rate",
+                        help="Probability of dropping a byte of synthesized capture")
+    parser.add_argument("-c", "--chunk", type=int, default=4096, dest="chunk",
+                        help="Bytes fed per call, emulates serial reads")
+    args = parser.parse_args()
+
+    if args.capture:
+        with open(args.capture, "rb") as f:
+            data = f.read()
+    else:
+        data = _synthesize(args.graphs, args.megabytes << 20, args.drop_rate, 0)
+
+    frame_parser = FrameParser(args.graphs)
+    # same path as acquisition: reads into the receive buffer, decodes in place
+    stream = io.BytesIO(data)
+    samples = np.empty((args.chunk // frame_parser.dtype.itemsize + 1, args.graphs), dtype="<i2")
+    started = time.perf_counter()
+    while frame_parser.receive(stream, args.chunk):
+        frame_parser.parse_into(samples)
+    # the empty read at the end trusts the last frame
+    frame_parser.parse_into(samples)
+    elapsed = time.perf_counter() - started
+    print(f"{len(data) / 2**20:.1f} MiB in {elapsed:.3f} s "
+          f"({len(data) / 2**20 / elapsed:.1f} MiB/s), "
+          f"frames: {frame_parser.frames}, resyncs: {frame_parser.resyncs}, "
+          f"discarded bytes: {frame_parser.discarded}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+import argparse
+import logging
+import os
+import signal
+import threading
+import time
+
+from labbox.acquisition import Acquisition
+from labbox.capture import CapturePort
+from labbox.defines import Cmd
+from labbox.metrics import Metrics, format_report
+from labbox.protocol import handshake
+from labbox.recording import open_log
+from labbox.transport import is_socket, open_transport
+
+
+def _open_port(path: str, baudrate: int, replay_speed: float):
+    if not is_socket(path) and not os.access(path, os.F_OK):
+        raise FileNotFoundError(f"No such device file: {path}")
+    return open_transport(path, baudrate, replay_speed=replay_speed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Records device data to disk without GUI.",
+        epilog=(
+            "Examples:\n"
+            "  record into a binary recording until interrupted:\n"
+            "    labbox-record /dev/ttyUSB0 -b 115200 -o capture.lbr\n"
+            "  record CSV for one minute:\n"
+            "    labbox-record /dev/ttyUSB0 -b 115200 -o capture.csv -t 60\n"
+        ),
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("device", help="Path to the device file")
+    parser.add_argument(
+        "-b",
+        "--baudrate",
+        help="Baudrate used to receive data",
+        choices=[1200, 2400, 4800, 9600, 19200, 38400, 57600, 115200],
+        default=115200,
+        type=int,
+        dest="baudrate",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="Output file, binary recording for .lbr extension and CSV otherwise",
+        required=True,
+        dest="output",
+    )
+    parser.add_argument(
+        "-t",
+        "--time",
+        help="Recording duration in seconds, records until interrupted by default",
+        type=float,
+        dest="duration",
+    )
+    parser.add_argument(
+        "-i",
+        "--interval",
+        help="Interval in seconds between throughput reports",
+        type=float,
+        default=1.0,
+        dest="interval",
+    )
+    parser.add_argument(
+        "--replay-speed",
+        help="Playback speed of a recording given as device, 0 reads it as fast as possible",
+        type=float,
+        default=0.0,
+        dest="replay_speed",
+    )
+    parser.add_argument(
+        "--handshake-timeout",
+        help="Seconds to wait for the device config, PC_HELLO is sent up to 3 times meanwhile",
+        type=float,
+        default=3.0,
+        dest="handshake_timeout",
+    )
+    parser.add_argument(
+        "-c",
+        "--capture",
+        help="Also dump raw received bytes to a file for 'labbox-generator --capture'",
+        dest="capture",
+    )
+    parser.add_argument(
+        "-m",
+        "--metrics",
+        help="Also append every report to a file as a JSON line",
+        dest="metrics",
+    )
+    args = parser.parse_args()
+    if args.replay_speed < 0:
+        parser.error("Replay speed can't be negative")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - [%(levelname)s] %(message)s")
+
+    try:
+        port = _open_port(args.device, args.baudrate, args.replay_speed)
+    except (OSError, RuntimeError, ValueError) as e:
+        raise SystemExit(f"Failed to open {args.device}: {e}")
+    try:
+        if args.capture:
+            port = CapturePort(port, args.capture)
+        connect = time.monotonic()
+        cfg_data = handshake(port, args.handshake_timeout, attempts=3)
+    except (OSError, RuntimeError, ValueError) as e:
+        port.close()
+        raise SystemExit(f"Failed to connect to {args.device}: {e}")
+    logging.info("Connected in %.0f ms  Signals: %s  Update time: %d ms",
+                 (time.monotonic() - connect) * 1000, cfg_data.namesList, cfg_data.updateTime)
+
+    try:
+        writer = open_log(args.output, cfg_data)
+    except (OSError, RuntimeError, ValueError) as e:
+        port.close()
+        raise SystemExit(f"Failed to open {args.output}: {e}")
+    writer.start()
+    metrics = Metrics(args.metrics)
+    acquisition = Acquisition(port, cfg_data, metrics)
+    frame_parser, clock, queue = acquisition.parser, acquisition.clock, acquisition.queue
+    # unattended rigs are stopped with SIGTERM, it ends recording like Ctrl-C
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+    started = time.monotonic()
+    try:
+        while not stopped.is_set() \
+                and (args.duration is None or time.monotonic() - started < args.duration):
+            acquisition.poll()
+            for block, times, gaps in queue.peek():
+                # writer runs in its own thread, queued views would be overwritten
+                writer.put(block.copy(), clock.seconds(times), gaps.copy())
+            queue.release()
+
+            if metrics.due(args.interval):
+                logging.info(format_report(metrics.report(
+                    resyncs=frame_parser.resyncs, dropped=frame_parser.dropped,
+                    discarded=frame_parser.discarded,
+                    lost=acquisition.lost, loss=acquisition.loss,
+                    queue=writer.depth, backpressure=writer.backpressure,
+                    log_dropped=writer.dropped,
+                ), render=False))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        try:
+            port.write(Cmd.PC_BYE.to_bytes(Cmd.SIZE, byteorder="little"))
+        except OSError:
+            pass
+        port.close()
+        writer.close()
+        metrics.close()
+    logging.info("Recorded %d frames to %s", metrics.frames, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import json
+import struct
+
+import numpy as np
+
+from labbox.blockwriter import BlockWriter
+from labbox.csvwriter import CsvWriter
+from labbox.defines import CfgData, Feature
+from labbox.protocol import sample_dtype
+
+MAGIC = b"LABBOX\x00\x01"
+EXTENSION = ".lbr"
+_LENGTH = struct.Struct("<I")
+
+# A recording starts with MAGIC, then the length and the JSON text of a header
+# holding CfgData fields. Frames follow as packed (time, samples) records up
+# to the end of file, so the whole data region maps onto a single array.
+# Time is in seconds since the first frame, samples are int16 unless the
+# formats in the header decode to a wider type. If the header's features
+# hold Feature.SEQUENCE, moments lost before every frame follow its time.
+
+
+def record_dtype(graph_numbers: int, dtype="<i2", gaps: bool = False) -> np.dtype:
+    samples = np.dtype(dtype).newbyteorder("<")
+    fields = [("time", "<f8")]
+    if gaps:
+        fields.append(("lost", "<u4"))
+    return np.dtype(fields + [("samples", samples, (graph_numbers,))])
+
+
+class RecordingWriter(BlockWriter):
+    """
+    Appends decoded sample blocks with their time values to a recording
+    """
+
+    def __init__(self, path: str, cfg_data: CfgData, **kwargs):
+        super().__init__(open(path, "wb"), **kwargs)
+        header = json.dumps({
+            "namesList": cfg_data.namesList,
+            "maxVoltage": cfg_data.maxVoltage,
+            "minVoltage": cfg_data.minVoltage,
+            "updateTime": cfg_data.updateTime,
+            "formats": cfg_data.formats,
+            # only features that change the records are kept
+            "features": cfg_data.features & Feature.SEQUENCE,
+        }).encode("utf-8")
+        self.file.write(MAGIC + _LENGTH.pack(len(header)) + header)
+        self.gaps = bool(cfg_data.features & Feature.SEQUENCE)
+        self.dtype = record_dtype(len(cfg_data.namesList), sample_dtype(cfg_data.formats),
+                                  self.gaps)
+
+    def format(self, samples: np.ndarray, times: np.ndarray, gaps: np.ndarray = None) -> bytes:
+        records = np.empty(len(samples), dtype=self.dtype)
+        records["time"] = times
+        if self.gaps:
+            records["lost"] = 0 if gaps is None else gaps
+        records["samples"] = samples
+        return records.tobytes()
+
+
+class Recording:
+    """
+    Read-only view of a recording, frames are memory mapped and loaded
+    from disk only when accessed
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a LabBox recording")
+            (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+            header = json.loads(f.read(length).decode("utf-8"))
+            offset = f.tell()
+            size = f.seek(0, 2) - offset
+        self.cfgData = CfgData()
+        for key, value in header.items():
+            setattr(self.cfgData, key, value)
+        self.cfgData.graphNumbers = len(self.cfgData.namesList)
+        dtype = record_dtype(self.cfgData.graphNumbers, sample_dtype(self.cfgData.formats),
+                             self.cfgData.features & Feature.SEQUENCE)
+        # a frame cut by an interrupted write is ignored
+        count = size // dtype.itemsize
+        if count:
+            self.frames = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+        else:
+            self.frames = np.empty(0, dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    @property
+    def times(self) -> np.ndarray:
+        return self.frames["time"]
+
+    @property
+    def samples(self) -> np.ndarray:
+        return self.frames["samples"]
+
+    @property
+    def gaps(self) -> np.ndarray:
+        """
+        :return: moments lost before every frame, None if not recorded
+        """
+        if "lost" not in self.frames.dtype.names:
+            return None
+        return self.frames["lost"]
+
+
+def open_log(path: str, cfg_data: CfgData) -> BlockWriter:
+    """
+    Creates a recording for paths with EXTENSION and CSV log otherwise
+    """
+    if path.endswith(EXTENSION):
+        return RecordingWriter(path, cfg_data)
+    return CsvWriter(path, cfg_data.namesList, sample_dtype(cfg_data.formats),
+                     bool(cfg_data.features & Feature.SEQUENCE))
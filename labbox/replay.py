@@ -0,0 +1,201 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from labbox.defines import Cmd, CfgData, Feature, Format
+from labbox.protocol import frame_dtype, sample_dtype
+from labbox.recording import Recording, EXTENSION as RECORDING_EXTENSION
+from labbox.transport import Transport
+
+REPLAY_EXTENSIONS = (RECORDING_EXTENSION, ".csv")
+
+
+def is_replay(path: str) -> bool:
+    return os.path.isfile(path) and path.endswith(REPLAY_EXTENSIONS)
+
+
+def load_csv(path: str):
+    """
+    Loads CSV written by LabBox, every column gets the smallest format
+    holding its values
+    :return: CfgData, (frames, graphNumbers) array of samples and (frames,)
+        moments lost before every frame, None if not logged
+    """
+    with open(path) as f:
+        names = [name.strip() for name in f.readline().split(",")]
+    data = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+    gaps = None
+    # time column ends the samples, lost column may follow it
+    if names[-2:] == ["time", "lost"]:
+        gaps = data[:, -1].astype(np.uint32)
+        names, data = names[:-1], data[:, :-1]
+    names = names[:-1]
+    columns = data[:, :-1]
+    cfg_data = CfgData()
+    cfg_data.namesList = names
+    cfg_data.graphNumbers = len(names)
+    for column in columns.T:
+        if not np.array_equal(column, np.round(column)):
+            cfg_data.formats.append(Format.FLOAT32)
+        elif np.all(np.abs(column) <= np.iinfo(np.int16).max):
+            cfg_data.formats.append(Format.INT16)
+        else:
+            cfg_data.formats.append(Format.INT32)
+    if not any(cfg_data.formats):
+        cfg_data.formats = []
+    samples = columns.astype(sample_dtype(cfg_data.formats))
+    if len(samples):
+        cfg_data.maxVoltage = int(samples.max()) * 1.1
+        cfg_data.minVoltage = int(samples.min()) * 1.1
+    # time column is in seconds, typical step between frames is updateTime
+    steps = np.diff(data[:, -1])
+    cfg_data.updateTime = max(int(round(np.median(steps) * 1000)), 1) if len(steps) else 10
+    return cfg_data, samples, gaps
+
+
+class ReplayPort(Transport):
+    """
+    Transport that plays a recording or a LabBox CSV back as
+    a device would: answers PC_HELLO with the recorded config and then emits
+    DATA_START frames paced by updateTime, scaled by speed (0 for as fast as
+    possible). Everything downstream of the port runs unchanged. Recorded
+    gaps are sent as gaps in sequence numbers, so they are marked again.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, timeout: float = 0.1,
+                 chunk: int = 1 << 14):
+        if path.endswith(RECORDING_EXTENSION):
+            recording = Recording(path)
+            self.cfgData, self.samples = recording.cfgData, recording.samples
+            self.gaps = recording.gaps
+        else:
+            self.cfgData, self.samples, self.gaps = load_csv(path)
+        self.speed = speed
+        self.timeout = timeout
+        self.chunk = chunk
+        # frames are sent fixed size, delta encoding of the source is not kept
+        self.formats = [fmt & Format.TYPE for fmt in self.cfgData.formats]
+        if not any(self.formats):
+            self.formats = []
+        self.features = Feature.FORMAT if self.formats else 0
+        if self.gaps is not None:
+            self.features |= Feature.SEQUENCE
+        self.dtype = frame_dtype(self.cfgData.graphNumbers, self.features, 0, self.formats)
+        self.period = self.cfgData.updateTime / 1000
+        self.position = 0
+        # sequence number of the next frame, counts recorded gaps too
+        self._sequence = 0
+        self._out = bytearray()
+        self._start = None
+        self._open = True
+        # seek comes from the GUI thread while reader thread reads
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) * self.period
+
+    def _config(self) -> bytes:
+        arr = (Cmd.CFG_START | self.features).to_bytes(4, byteorder="little")
+        arr += self.cfgData.graphNumbers.to_bytes(1, byteorder="little")
+        # voltages of wider formats are cut to the range of the config field
+        for voltage in (self.cfgData.maxVoltage, self.cfgData.minVoltage):
+            voltage = min(max(round(voltage / 1.1), -0x8000), 0x7FFF)
+            arr += voltage.to_bytes(2, byteorder="little", signed=True)
+        arr += min(self.cfgData.updateTime, 0xFF).to_bytes(1, byteorder="little")
+        for name in self.cfgData.namesList:
+            encoded = name.encode("utf-8")
+            arr += len(encoded).to_bytes(1, byteorder="little") + encoded
+        if self.features & Feature.FORMAT:
+            arr += bytes(self.formats)
+        return arr
+
+    def _due(self) -> int:
+        if self._start is None:
+            return self.position
+        if not self.speed:
+            return min(self.position + self.chunk, len(self.samples))
+        elapsed = (time.monotonic() - self._start) * self.speed
+        return min(self._base + int(elapsed / self.period), len(self.samples))
+
+    def _produce(self) -> None:
+        due = min(self._due(), self.position + self.chunk)
+        if due <= self.position:
+            return
+        frames = np.empty(due - self.position, dtype=self.dtype)
+        frames["header"] = Cmd.DATA_START
+        if self.gaps is not None:
+            numbers = np.cumsum(self.gaps[self.position:due], dtype=np.int64)
+            numbers += np.arange(self._sequence, self._sequence + len(frames))
+            frames["sequence"] = numbers & 0xFFFFFFFF
+            self._sequence = int(numbers[-1]) + 1
+        samples = frames["samples"]
+        if samples.dtype.names:
+            for name in samples.dtype.names:
+                samples[name] = self.samples[self.position:due, int(name[1:])]
+        else:
+            samples[...] = self.samples[self.position:due]
+        self._out += frames.tobytes()
+        self.position = due
+
+    def seek(self, seconds: float) -> None:
+        """
+        Continues playback from the given offset into the recording
+        """
+        with self._lock:
+            self.position = min(max(int(seconds / self.period), 0), len(self.samples))
+            self._out.clear()
+            if self._start is not None:
+                self._restart()
+
+    def tell(self) -> float:
+        return self.position * self.period
+
+    def _restart(self) -> None:
+        self._start = time.monotonic()
+        self._base = self.position
+
+    @property
+    def in_waiting(self) -> int:
+        with self._lock:
+            self._produce()
+            return len(self._out)
+
+    def readinto(self, buffer) -> int:
+        with self._lock:
+            self._produce()
+            delay = self.timeout
+            if self.speed and self._start is not None and self.position < len(self.samples):
+                due = self._start + (self.position - self._base + 1) * self.period / self.speed
+                delay = min(max(due - time.monotonic(), 0), self.timeout)
+        if not self._out:
+            # wait for the next frame like a serial port read with timeout
+            time.sleep(delay)
+        with self._lock:
+            self._produce()
+            size = min(len(buffer), len(self._out))
+            memoryview(buffer).cast("B")[:size] = self._out[:size]
+            del self._out[:size]
+        return size
+
+    def write(self, data: bytes) -> int:
+        with self._lock:
+            for offset in range(0, len(data) - Cmd.SIZE + 1, Cmd.SIZE):
+                cmd = int.from_bytes(data[offset:offset + Cmd.SIZE], byteorder="little")
+                if cmd == Cmd.PC_HELLO:
+                    self._out = bytearray(self._config())
+                    self._restart()
+                elif cmd == Cmd.PC_BYE:
+                    self._start = None
+        return len(data)
+
+    def isOpen(self) -> bool:
+        return self._open
+
+    def close(self) -> None:
+        self._open = False
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed capacity buffer of the latest samples of every channel, backed by a
+    single (channels, 2 * capacity) array. Every sample is stored twice,
+    capacity apart, so the latest samples always form a contiguous view and
+    rendering never has to reorder or copy them.
+    """
+
+    def __init__(self, channels: int, capacity: int, dtype=np.int16):
+        self.channels = channels
+        self.capacity = capacity
+        self.data = np.zeros((channels, 2 * capacity), dtype=dtype)
+        self.head = 0
+        self.size = 0
+        self.total = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def extend(self, block: np.ndarray) -> None:
+        """
+        Appends a block of samples
+        :param block: (frames, channels) array
+        """
+        count = len(block)
+        if not count:
+            return
+        self.total += count
+        cap = self.capacity
+        if count >= cap:
+            self.data[:, :cap] = block[-cap:].T
+            self.data[:, cap:] = block[-cap:].T
+            self.head = 0
+            self.size = cap
+            return
+        start, end = self.head, self.head + count
+        self.data[:, start:end] = block.T
+        # mirror written samples into the other half, copying from the block
+        # itself since overlapping copies within data need a temporary array
+        split = min(end, cap)
+        self.data[:, start + cap:split + cap] = block[:split - start].T
+        if end > cap:
+            self.data[:, :end - cap] = block[split - start:].T
+        self.head = end % cap
+        self.size = min(self.size + count, cap)
+
+    def view(self) -> np.ndarray:
+        """
+        :return: (channels, size) view of stored samples, oldest first
+        """
+        end = self.head + self.capacity
+        return self.data[:, end - self.size:end]
+
+    def resize(self, capacity: int) -> None:
+        """
+        Changes capacity keeping the latest samples
+        """
+        latest = self.view()[:, -capacity:].T.copy()
+        total = self.total
+        self.__init__(self.channels, capacity, self.data.dtype)
+        self.extend(latest)
+        self.total = total
+
+    def clear(self) -> None:
+        self.head = 0
+        self.size = 0
+        self.total = 0
@@ -0,0 +1,113 @@
+import numpy as np
+
+TICK_NS = 1000
+_TICK_WRAP = 1 << 32
+
+
+class SampleClock:
+    """
+    Assigns host time.monotonic_ns moments to decoded frames. Every block is
+    stamped when it was read, frames inside are spaced by the announced
+    updateTime back from the stamp, as the last one has just arrived. When
+    a block arrived faster than updateTime allows (it was batched by the OS
+    or the device runs fast), its frames are spread evenly between the
+    previous frame and the stamp instead, so time never runs backwards.
+    Moments known to be lost still take their periods, so gaps stay visible
+    instead of compressing the time axis.
+
+    With device ticks frames are timed by the device clock instead, which
+    is aligned to the host clock by the first stamped block.
+    """
+
+    def __init__(self, update_time: int):
+        """
+        :param update_time: announced interval between frames in ms
+        """
+        self.period = update_time * 1_000_000
+        # moment of the very first frame, times in logs are relative to it
+        self.origin = None
+        self.last = None
+        self._tick_offset = None
+        self._tick_last = None
+        self._arange = np.arange(0, dtype=np.int64)
+        self._ticks = np.empty(0, dtype=np.int64)
+        self._positions = np.empty(0, dtype=np.int64)
+
+    def _steps(self, count: int) -> np.ndarray:
+        """
+        :return: view of 0, 1, ..., count, kept between calls
+        """
+        if len(self._arange) <= count:
+            self._arange = np.arange(max(2 * len(self._arange), count + 1), dtype=np.int64)
+        return self._arange[:count + 1]
+
+    def stamp(self, count: int, now: int, ticks: np.ndarray = None,
+              out: np.ndarray = None, gaps: np.ndarray = None) -> np.ndarray:
+        """
+        :param count: number of frames in the block
+        :param now: time.monotonic_ns when the block was read
+        :param ticks: device clock of every frame in us, u32 wrapping around
+        :param out: (count,) int64 array to write into instead of a new one
+        :param gaps: moments lost before every frame, spaced as if received
+        :return: (count,) int64 array of ns moments
+        """
+        if out is None:
+            out = np.empty(count, dtype=np.int64)
+        if ticks is not None:
+            self._from_ticks(ticks, now, out)
+        elif count:
+            positions = self._positions_of(count, gaps)
+            span = int(positions[-1])
+            # back from now by whole periods, computed in place
+            np.subtract(positions, span, out=out)
+            out *= self.period
+            out += now
+            if self.last is not None and out[0] <= self.last:
+                np.multiply(positions, now - self.last, out=out)
+                np.floor_divide(out, span, out=out)
+                out += self.last
+        if count:
+            if self.origin is None:
+                self.origin = int(out[0])
+            self.last = int(out[-1])
+        return out
+
+    def _positions_of(self, count: int, gaps: np.ndarray = None) -> np.ndarray:
+        """
+        :return: periods from the previous frame to every frame, 1, 2, ...,
+            count unless moments were lost in between
+        """
+        if gaps is None or not gaps.any():
+            return self._steps(count)[1:]
+        if len(self._positions) < count:
+            self._positions = np.empty(2 * count, dtype=np.int64)
+        positions = self._positions[:count]
+        np.cumsum(gaps, dtype=np.int64, out=positions)
+        positions += self._steps(count)[1:]
+        return positions
+
+    def _from_ticks(self, ticks: np.ndarray, now: int, out: np.ndarray) -> None:
+        if not len(ticks):
+            return
+        base = int(ticks[0]) if self._tick_last is None else self._tick_last
+        if len(self._ticks) < len(ticks):
+            self._ticks = np.empty(2 * len(ticks), dtype=np.int64)
+        wide = self._ticks[:len(ticks)]
+        wide[:] = ticks
+        # unwrap the 32-bit counter by summing steps modulo its range
+        np.subtract(wide[1:], wide[:-1], out=out[1:])
+        out[0] = wide[0] - base % _TICK_WRAP
+        out &= _TICK_WRAP - 1
+        np.cumsum(out, out=out)
+        out += base
+        self._tick_last = int(out[-1])
+        if self._tick_offset is None:
+            self._tick_offset = now - self._tick_last * TICK_NS
+        out *= TICK_NS
+        out += self._tick_offset
+
+    def seconds(self, times: np.ndarray) -> np.ndarray:
+        """
+        :return: times in seconds since the first frame
+        """
+        return (times - self.origin) / 1e9
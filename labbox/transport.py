@@ -0,0 +1,236 @@
+import os
+import select
+import socket
+import struct
+import time
+
+import serial
+
+if os.name == "posix":
+    import fcntl
+    import termios
+    import tty
+
+RAW_EXTENSIONS = (".bin", ".raw")
+_INT = struct.Struct("i")
+
+# Devices are reached through a transport chosen once at connect time from the
+# device path: tcp://host:port and unix:///path are sockets, recordings and
+# CSV logs are replayed, .bin/.raw files are read as raw received bytes,
+# /dev/pts/* are pseudo terminals and anything else is a serial port.
+
+
+class Transport:
+    """
+    Byte stream to a device. Reads follow serial.Serial semantics: they
+    wait until the buffer is full or timeout elapses, whichever comes first.
+    """
+    timeout = 0.1
+
+    def readinto(self, buffer) -> int:
+        """
+        Reads directly into a caller owned buffer
+        :param buffer: writable bytes-like object
+        :return: number of bytes read, 0 on timeout
+        """
+        raise NotImplementedError
+
+    def read(self, size: int = 1) -> bytes:
+        buffer = bytearray(size)
+        return bytes(buffer[:self.readinto(buffer)])
+
+    def write(self, data) -> int:
+        raise NotImplementedError
+
+    def writelines(self, chunks) -> int:
+        """
+        Sends several commands with a single write
+        """
+        return self.write(b"".join(chunks))
+
+    @property
+    def in_waiting(self) -> int:
+        raise NotImplementedError
+
+    def isOpen(self) -> bool:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        raise NotImplementedError
+
+
+class StreamTransport(Transport):
+    """
+    Transport over a file descriptor: waits for data with select and reads
+    straight into the caller's buffer
+    """
+
+    def __init__(self, fd: int, timeout: float = 0.1):
+        self.fd = fd
+        self.timeout = timeout
+
+    def _recv_into(self, view) -> int:
+        return os.readv(self.fd, [view])
+
+    def _send(self, view) -> int:
+        return os.write(self.fd, view)
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast("B")
+        deadline = time.monotonic() + self.timeout
+        count = 0
+        while count < len(view):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([self.fd], [], [], remaining)[0]:
+                break
+            received = self._recv_into(view[count:])
+            if not received:
+                raise ConnectionError("Device disconnected.")
+            count += received
+        return count
+
+    def write(self, data) -> int:
+        view = memoryview(data).cast("B")
+        while view:
+            view = view[self._send(view):]
+        return len(data)
+
+    @property
+    def in_waiting(self) -> int:
+        return _INT.unpack(fcntl.ioctl(self.fd, termios.FIONREAD, _INT.pack(0)))[0]
+
+    def isOpen(self) -> bool:
+        return self.fd is not None
+
+    def close(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class PtyTransport(StreamTransport):
+    """
+    Pseudo terminal, e.g. served by labbox-generator, baudrate has no meaning
+    """
+
+    def __init__(self, path: str, timeout: float = 0.1):
+        fd = os.open(path, os.O_RDWR | os.O_NOCTTY)
+        tty.setraw(fd)
+        super().__init__(fd, timeout)
+
+
+class SerialTransport(Transport):
+    """
+    Serial port handled by pyserial
+    """
+
+    def __init__(self, path: str, baudrate: int, timeout: float = 0.1):
+        self.timeout = timeout
+        self.serial = serial.Serial(
+            port=path,
+            baudrate=baudrate,
+            parity=serial.PARITY_NONE,
+            stopbits=serial.STOPBITS_ONE,
+            bytesize=serial.EIGHTBITS,
+            timeout=timeout,
+        )
+
+    def readinto(self, buffer) -> int:
+        return self.serial.readinto(buffer)
+
+    def write(self, data) -> int:
+        try:
+            return self.serial.write(data)
+        except serial.SerialTimeoutException:
+            raise TimeoutError("Timeout elapsed!")
+
+    @property
+    def in_waiting(self) -> int:
+        return self.serial.in_waiting
+
+    def isOpen(self) -> bool:
+        return self.serial.isOpen()
+
+    def close(self) -> None:
+        self.serial.close()
+
+
+class SocketTransport(StreamTransport):
+    """
+    Device or bridge listening on a local TCP or Unix socket
+    """
+
+    def __init__(self, address: str, timeout: float = 0.1):
+        if address.startswith("unix://"):
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            target = address[len("unix://"):]
+        else:
+            host, _, port = address[len("tcp://"):].rpartition(":")
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            target = (host, int(port))
+        try:
+            self.socket.connect(target)
+        except (OSError, ValueError) as e:
+            self.socket.close()
+            raise RuntimeError("Can't connect to " + address + ":\n" + str(e))
+        super().__init__(self.socket.fileno(), timeout)
+
+    def _recv_into(self, view) -> int:
+        return self.socket.recv_into(view)
+
+    def _send(self, view) -> int:
+        return self.socket.send(view)
+
+    def close(self) -> None:
+        self.socket.close()
+        self.fd = None
+
+
+class FileTransport(StreamTransport):
+    """
+    Raw bytes received from a device earlier, e.g. dumped with
+    cat /dev/ttyUSB0 > dump.bin. Writes are ignored and the file is read
+    at once, so the dump must start with the CFG_START block.
+    """
+
+    def __init__(self, path: str, timeout: float = 0.1):
+        super().__init__(os.open(path, os.O_RDONLY), timeout)
+
+    def readinto(self, buffer) -> int:
+        received = os.readv(self.fd, [buffer])
+        if not received:
+            # end of dump behaves like a silent device
+            time.sleep(self.timeout)
+        return received
+
+    def write(self, data) -> int:
+        return len(data)
+
+    @property
+    def in_waiting(self) -> int:
+        return os.fstat(self.fd).st_size - os.lseek(self.fd, 0, os.SEEK_CUR)
+
+
+def is_socket(path: str) -> bool:
+    return path.startswith(("tcp://", "unix://"))
+
+
+def open_transport(path: str, baudrate: int = 115200, replay_speed: float = 1.0,
+                   timeout: float = 0.1) -> Transport:
+    """
+    Chooses transport by device path
+    :param replay_speed: playback speed of recordings, 0 for no pauses
+    """
+    # replay depends on recording and this module, so it's imported here
+    from labbox.replay import ReplayPort, is_replay
+
+    if is_socket(path):
+        return SocketTransport(path, timeout)
+    if is_replay(path):
+        return ReplayPort(path, speed=replay_speed, timeout=timeout)
+    if os.path.isfile(path) and path.endswith(RAW_EXTENSIONS):
+        return FileTransport(path, timeout)
+    if path.startswith("/dev/pts/"):
+        return PtyTransport(path, timeout)
+    return SerialTransport(path, baudrate, timeout)
@@ -88,6 +88,24 @@ class Ui_Config(object):
         self.updateTimeSpinBox.setSingleStep(10)
         self.updateTimeSpinBox.setObjectName("updateTimeSpinBox")
         self.formLayout.setWidget(4, QtWidgets.QFormLayout.FieldRole, self.updateTimeSpinBox)
+        self.blockLengthLabel = QtWidgets.QLabel(Config)
+        self.blockLengthLabel.setObjectName("blockLengthLabel")
+        self.formLayout.setWidget(5, QtWidgets.QFormLayout.LabelRole, self.blockLengthLabel)
+        self.blockLengthSpinBox = QtWidgets.QSpinBox(Config)
+        self.blockLengthSpinBox.setMinimumSize(QtCore.QSize(150, 30))
+        self.blockLengthSpinBox.setMaximumSize(QtCore.QSize(150, 30))
+        self.blockLengthSpinBox.setMaximum(1024)
+        self.blockLengthSpinBox.setSingleStep(16)
+        self.blockLengthSpinBox.setObjectName("blockLengthSpinBox")
+        self.formLayout.setWidget(5, QtWidgets.QFormLayout.FieldRole, self.blockLengthSpinBox)
+        self.sampleFormatLabel = QtWidgets.QLabel(Config)
+        self.sampleFormatLabel.setObjectName("sampleFormatLabel")
+        self.formLayout.setWidget(6, QtWidgets.QFormLayout.LabelRole, self.sampleFormatLabel)
+        self.sampleFormatComboBox = QtWidgets.QComboBox(Config)
+        self.sampleFormatComboBox.setMinimumSize(QtCore.QSize(150, 30))
+        self.sampleFormatComboBox.setMaximumSize(QtCore.QSize(150, 30))
+        self.sampleFormatComboBox.setObjectName("sampleFormatComboBox")
+        self.formLayout.setWidget(6, QtWidgets.QFormLayout.FieldRole, self.sampleFormatComboBox)
         self.verticalLayout.addLayout(self.formLayout)
         self.generateButton = QtWidgets.QPushButton(Config)
         self.generateButton.setMinimumSize(QtCore.QSize(330, 30))
@@ -118,4 +136,7 @@ class Ui_Config(object):
         self.updateTimeLabel.setText(_translate("Config", "Update time: "))
         self.maxVoltageSpinBox.setSuffix(_translate("Config", " mV"))
         self.updateTimeSpinBox.setSuffix(_translate("Config", " ms"))
+        self.blockLengthLabel.setText(_translate("Config", "Block length: "))
+        self.blockLengthSpinBox.setSpecialValueText(_translate("Config", "off"))
+        self.sampleFormatLabel.setText(_translate("Config", "Sample format: "))
         self.generateButton.setText(_translate("Config", "Generate"))
@@ -0,0 +1,25 @@
+import pytest
+
+from labbox.bench.allocations import measure
+from labbox.defines import Feature, Format
+
+BUDGET = 4096
+
+
+@pytest.mark.parametrize("features, block_length, fmt", [
+    (0, 0, None),
+    (Feature.TICK | Feature.SEQUENCE, 0, None),
+    (Feature.BLOCK, 64, None),
+    (Feature.BLOCK | Feature.TICK | Feature.SEQUENCE, 64, None),
+    (Feature.BLOCK | Feature.FORMAT, 64, Format.INT16 | Format.DELTA),
+], ids=["plain", "plain-numbered", "block", "block-numbered", "delta"])
+@pytest.mark.parametrize("channels", [1, 4])
+def test_streaming_allocates_nothing_per_frame(channels, features, block_length, fmt):
+    formats = [fmt] * channels if fmt is not None else None
+    small, large = (measure(channels, 10000, 40, chunk, features, block_length, formats)
+                    for chunk in (1 << 16, 1 << 19))
+
+    assert small["frames"] and large["frames"]
+    assert max(small["growth_bytes"], large["growth_bytes"]) <= BUDGET
+    # a per frame allocation makes the peak grow with the frames per read
+    assert large["peak_bytes"] - small["peak_bytes"] <= BUDGET
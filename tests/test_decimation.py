@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from labbox.decimation import MinMaxDecimator
+from labbox.ringbuffer import RingBuffer
+
+
+def _buckets(samples: np.ndarray, x: np.ndarray) -> tuple:
+    """
+    :return: min and max of samples between consecutive bucket starts
+    """
+    starts = x[0::2]
+    ends = np.append(starts[1:], samples.shape[1])
+    mins = np.stack([samples[:, s:e].min(axis=1) for s, e in zip(starts, ends)], axis=1)
+    maxs = np.stack([samples[:, s:e].max(axis=1) for s, e in zip(starts, ends)], axis=1)
+    return mins, maxs
+
+
+@pytest.mark.parametrize("capacity, pixels", [(1000, 100), (997, 30), (5000, 7), (50, 100)])
+@pytest.mark.parametrize("seed", range(3))
+def test_cached_buckets_match_fresh_reduction(capacity, pixels, seed):
+    rng = np.random.default_rng(seed)
+    buffer = RingBuffer(2, capacity)
+    decimator = MinMaxDecimator()
+    for step in range(150):
+        # mostly short blocks, now and then one dropping every cached bucket
+        size = int(rng.integers(0, 3 * capacity)) if step % 37 == 0 \
+            else int(rng.integers(0, capacity // 10 + 2))
+        buffer.extend(rng.integers(-1000, 1000, (size, 2)).astype(np.int16))
+        samples = buffer.view()
+        if not samples.shape[1]:
+            continue
+        width = pixels + int(step >= 100)
+        x, y = decimator.reduce(samples, buffer.total, capacity, width)
+        fresh_x, fresh_y = MinMaxDecimator().reduce(samples, buffer.total, capacity, width)
+
+        np.testing.assert_array_equal(x, fresh_x)
+        np.testing.assert_array_equal(y, fresh_y)
+        # spikes stay visible
+        np.testing.assert_array_equal(y.min(axis=1), samples.min(axis=1))
+        np.testing.assert_array_equal(y.max(axis=1), samples.max(axis=1))
+        if len(x) != samples.shape[1]:
+            mins, maxs = _buckets(samples, x)
+            np.testing.assert_array_equal(y[:, 0::2], mins)
+            np.testing.assert_array_equal(y[:, 1::2], maxs)
@@ -0,0 +1,114 @@
+import io
+
+import numpy as np
+import pytest
+
+from labbox.defines import Cmd, Feature, Format
+from labbox.generator import synthesize
+from labbox.protocol import DATA_MARKER, FrameParser, frame_dtype
+
+
+SIGNALS = ["sin", "saw", "tri"]
+FREQS = [1, 2, 3]
+
+
+def _frames(features: int, block_length: int, number: int) -> list[bytes]:
+    size = block_length or 1
+    t = np.arange(number * size) / 1000
+    return [synthesize(SIGNALS, FREQS, t[i * size:(i + 1) * size], -3000, 3000,
+                       features, block_length, first=i * size) for i in range(number)]
+
+
+@pytest.mark.parametrize("block_length", [0, 8])
+@pytest.mark.parametrize("flip", [1, 1 << 31])
+def test_corrupted_sequence_of_last_frame_in_chunk(block_length, flip):
+    features = Feature.SEQUENCE | (Feature.BLOCK if block_length else 0)
+    frames = _frames(features, block_length, 60)
+    parser = FrameParser(len(SIGNALS), features=features, block_length=block_length)
+    at = parser.dtype.fields["sequence"][1]
+    # frames 20 to 24 are lost on the way
+    kept = frames[:20] + frames[25:]
+    lost = 5 * (block_length or 1)
+    corrupted = [10, 30, 50]
+    for i in corrupted:
+        frame = bytearray(kept[i])
+        sequence = int.from_bytes(frame[at:at + 4], byteorder="little") ^ flip
+        frame[at:at + 4] = sequence.to_bytes(4, byteorder="little")
+        kept[i] = bytes(frame)
+
+    gaps = []
+    start = 0
+    # every chunk ends with a corrupted frame and the marker of the next one
+    for i in corrupted + [len(kept)]:
+        stop = i + 1
+        chunk = b"".join(kept[start:stop])
+        if stop < len(kept):
+            chunk += kept[stop][:Cmd.SIZE]
+            kept[stop] = kept[stop][Cmd.SIZE:]
+        parser.feed(chunk)
+        gaps.append(parser.gaps)
+        start = stop
+    gaps = np.concatenate(gaps)
+
+    assert gaps.max() < 1 << 31
+    assert parser.lost == lost
+    assert gaps.sum() == lost
+    assert np.count_nonzero(gaps) == 1
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_delta_blocks_resync_after_dropped_and_corrupted_bytes(seed):
+    formats = [Format.INT16 | Format.DELTA, Format.INT8, Format.INT32 | Format.DELTA]
+    features = Feature.BLOCK | Feature.FORMAT
+    block_length = 16
+    t = np.arange(200 * block_length) / 1000
+    data = synthesize(SIGNALS, FREQS, t, -3000, 3000, features, block_length, formats)
+
+    def parse(data: bytes) -> np.ndarray:
+        parser = FrameParser(len(SIGNALS), features=features, block_length=block_length,
+                             formats=formats)
+        return np.concatenate([parser.feed(data[i:i + 500]) for i in range(0, len(data), 500)])
+
+    expected = parse(data)
+    assert len(expected) == len(t) - block_length
+
+    rng = np.random.default_rng(seed)
+    damaged = bytearray(data[:len(data) // 2])
+    for at in sorted(rng.choice(len(damaged), 20, replace=False), reverse=True):
+        if rng.random() < 0.5:
+            del damaged[at]
+        else:
+            damaged[at] ^= int(rng.integers(1, 256))
+    # size of a block claims more bytes than any block may take
+    head = frame_dtype(len(SIGNALS), features, 0, formats)
+    size_at = damaged.find(DATA_MARKER, len(damaged) // 2) + head.fields["size"][1]
+    damaged[size_at:size_at + 2] = b"\xff\xff"
+    received = parse(bytes(damaged) + data[len(data) // 2:])
+
+    # every block after the damage is decoded
+    tail = len(t) // 2 - 2 * block_length
+    np.testing.assert_array_equal(received[-tail:], expected[-tail:])
+
+
+@pytest.mark.parametrize("block_length, formats", [
+    (0, None),
+    (8, None),
+    (8, [Format.INT16 | Format.DELTA, Format.INT8, Format.INT32 | Format.DELTA]),
+])
+def test_last_frame_is_parsed_once_nothing_more_comes(block_length, formats):
+    features = Feature.SEQUENCE | (Feature.BLOCK if block_length else 0) \
+        | (Feature.FORMAT if formats else 0)
+    t = np.arange(10 * (block_length or 1)) / 1000
+    data = synthesize(SIGNALS, FREQS, t, -3000, 3000, features, block_length, formats)
+    parser = FrameParser(len(SIGNALS), features=features, block_length=block_length,
+                         formats=formats)
+    samples = np.empty((len(t), len(SIGNALS)), parser.sample_dtype)
+    port = io.BytesIO(data)
+
+    assert parser.receive(port, len(data)) == len(data)
+    assert parser.parse_into(samples) == len(t) - (block_length or 1)
+    # read timed out
+    assert parser.receive(port, len(data)) == 0
+    assert parser.parse_into(samples) == (block_length or 1)
+    assert parser.frames == len(t)
+    assert parser.pending == 0
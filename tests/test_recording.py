@@ -0,0 +1,118 @@
+import sys
+
+import numpy as np
+import pytest
+
+from labbox import export
+from labbox.csvwriter import CsvWriter
+from labbox.defines import CfgData, Feature, Format
+from labbox.recording import Recording, RecordingWriter, open_log
+from labbox.replay import load_csv
+
+
+def _cfg(formats: list, features: int = 0) -> CfgData:
+    cfg_data = CfgData()
+    cfg_data.namesList = ["a", "b", "c"][:len(formats)]
+    cfg_data.graphNumbers = len(formats)
+    cfg_data.maxVoltage = 3300.0
+    cfg_data.minVoltage = -3300.0
+    cfg_data.updateTime = 10
+    cfg_data.features = features
+    cfg_data.formats = formats
+    return cfg_data
+
+
+def _write(writer, samples: np.ndarray, times: np.ndarray, gaps: np.ndarray = None) -> None:
+    writer.start()
+    for start in range(0, len(samples), 7):
+        writer.put(samples[start:start + 7], times[start:start + 7],
+                   None if gaps is None else gaps[start:start + 7])
+    writer.close()
+    assert writer.error is None
+
+
+@pytest.fixture
+def stream():
+    rng = np.random.default_rng(0)
+    samples = np.empty((50, 3), dtype=np.float64)
+    samples[:, 0] = rng.integers(-128, 128, 50)
+    samples[:, 1] = rng.integers(-100000, 100000, 50)
+    samples[:, 2] = rng.normal(size=50).astype(np.float32)
+    times = np.arange(50) * 0.01
+    gaps = np.zeros(50, dtype=np.uint32)
+    gaps[[5, 20, 21]] = [3, 1, 700]
+    return samples, times, gaps
+
+
+def test_recording_round_trip(tmp_path, stream):
+    samples, times, gaps = stream
+    cfg_data = _cfg([Format.INT8, Format.INT32, Format.FLOAT32],
+                    Feature.FORMAT | Feature.SEQUENCE | Feature.TICK)
+    path = str(tmp_path / "capture.lbr")
+    writer = open_log(path, cfg_data)
+    assert isinstance(writer, RecordingWriter)
+    _write(writer, samples, times, gaps)
+    # a record cut by an interrupted write
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")
+
+    recording = Recording(path)
+    assert len(recording) == len(samples)
+    assert recording.cfgData.namesList == cfg_data.namesList
+    assert recording.cfgData.graphNumbers == 3
+    assert recording.cfgData.updateTime == 10
+    # only features changing the records are kept
+    assert recording.cfgData.features == Feature.SEQUENCE
+    assert isinstance(recording.frames, np.memmap)
+    np.testing.assert_array_equal(recording.samples, samples.astype(recording.samples.dtype))
+    np.testing.assert_array_equal(recording.times, times)
+    np.testing.assert_array_equal(recording.gaps, gaps)
+
+
+def test_recording_without_sequence_has_no_gaps(tmp_path, stream):
+    samples, times, _ = stream
+    path = str(tmp_path / "capture.lbr")
+    _write(RecordingWriter(path, _cfg([Format.INT16] * 2)),
+           samples[:, :2].astype(np.int16), times)
+
+    recording = Recording(path)
+    assert recording.gaps is None
+    assert recording.samples.dtype == np.int16
+    np.testing.assert_array_equal(recording.samples, samples[:, :2].astype(np.int16))
+
+
+def test_empty_recording(tmp_path):
+    path = str(tmp_path / "empty.lbr")
+    _write(RecordingWriter(path, _cfg([Format.INT16])), np.empty((0, 1)), np.empty(0))
+    assert len(Recording(path)) == 0
+
+
+def test_export_to_csv_and_load(tmp_path, stream, monkeypatch):
+    samples, times, gaps = stream
+    path = tmp_path / "capture.lbr"
+    cfg_data = _cfg([Format.INT8, Format.INT32, Format.FLOAT32], Feature.SEQUENCE)
+    _write(RecordingWriter(str(path), cfg_data), samples, times, gaps)
+
+    monkeypatch.setattr(sys, "argv", ["labbox-export", str(path), "-c", "16"])
+    export.main()
+
+    loaded, loaded_samples, loaded_gaps = load_csv(str(tmp_path / "capture.csv"))
+    assert loaded.namesList == cfg_data.namesList
+    assert loaded.formats == [Format.INT16, Format.INT32, Format.FLOAT32]
+    assert loaded.updateTime == 10
+    np.testing.assert_array_equal(loaded_gaps, gaps)
+    np.testing.assert_array_equal(loaded_samples[:, :2], samples[:, :2])
+    np.testing.assert_allclose(loaded_samples[:, 2], samples[:, 2], rtol=1e-6)
+
+
+def test_load_csv_without_lost_column(tmp_path):
+    path = str(tmp_path / "log.csv")
+    samples = np.arange(20, dtype=np.int16).reshape(10, 2)
+    _write(CsvWriter(path, ["x", "y"]), samples, np.arange(10) * 0.005)
+
+    cfg_data, loaded, gaps = load_csv(path)
+    assert gaps is None
+    assert cfg_data.namesList == ["x", "y"]
+    assert cfg_data.formats == []
+    assert cfg_data.updateTime == 5
+    np.testing.assert_array_equal(loaded, samples)
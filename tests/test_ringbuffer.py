@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from labbox.ringbuffer import RingBuffer
+
+
+def _blocks(rng, channels: int, capacity: int, count: int) -> list:
+    # short blocks wrap around the end, long ones replace everything
+    sizes = rng.integers(0, 2 * capacity + 2, count)
+    sizes[rng.random(count) < 0.7] %= max(capacity // 3, 1)
+    return [rng.integers(-1000, 1000, (size, channels)).astype(np.int16) for size in sizes]
+
+
+@pytest.mark.parametrize("capacity", [1, 2, 7, 100])
+@pytest.mark.parametrize("seed", range(3))
+def test_view_holds_latest_samples(capacity, seed):
+    rng = np.random.default_rng(seed)
+    buffer = RingBuffer(3, capacity)
+    received = np.empty((0, 3), dtype=np.int16)
+    for block in _blocks(rng, 3, capacity, 200):
+        buffer.extend(block)
+        received = np.concatenate((received, block))
+        np.testing.assert_array_equal(buffer.view(), received[-capacity:].T)
+        assert len(buffer) == min(len(received), capacity)
+        assert buffer.total == len(received)
+
+
+def test_block_of_capacity_or_more_replaces_everything():
+    buffer = RingBuffer(2, 4)
+    buffer.extend(np.arange(6).reshape(3, 2))
+    block = np.arange(100, 110).reshape(5, 2)
+    buffer.extend(block)
+    np.testing.assert_array_equal(buffer.view(), block[-4:].T)
+    buffer.extend(block[:4])
+    np.testing.assert_array_equal(buffer.view(), block[:4].T)
+    assert buffer.total == 12
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_resize_keeps_latest_samples(seed):
+    rng = np.random.default_rng(seed)
+    capacity = 10
+    buffer = RingBuffer(2, capacity)
+    received = np.empty((0, 2), dtype=np.int16)
+    for block in _blocks(rng, 2, capacity, 100):
+        buffer.extend(block)
+        received = np.concatenate((received, block))
+        if rng.random() < 0.2:
+            capacity = int(rng.integers(1, 30))
+            kept = min(len(buffer), capacity)
+            buffer.resize(capacity)
+            # samples dropped by the previous capacity don't come back
+            received = received[len(received) - kept:] if kept else received[:0]
+        np.testing.assert_array_equal(buffer.view(), received[-capacity:].T)
+        assert buffer.capacity == capacity
+
+
+def test_clear():
+    buffer = RingBuffer(1, 3)
+    buffer.extend(np.ones((5, 1)))
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.total == 0
+    assert buffer.view().shape == (1, 0)